@@ -167,12 +167,14 @@ class AbstractCommonModel(models.Model):
     def get_summary_fields(self):
         response = {}
         for field in self._meta.fields:
-            if isinstance(field, models.ForeignObject) and getattr(self, field.name):
-                # ignore relations on inherited django models
-                if field.name.endswith("_ptr") or (field.name in self.ignore_relations):
-                    continue
-                if hasattr(getattr(self, field.name), 'summary_fields'):
-                    response[field.name] = getattr(self, field.name).summary_fields()
+            if not isinstance(field, models.ForeignObject):
+                continue
+            # ignore relations on inherited django models, checked before access so ignored relations are never fetched
+            if field.name.endswith("_ptr") or (field.name in self.ignore_relations):
+                continue
+            related_obj = getattr(self, field.name)
+            if related_obj and hasattr(related_obj, 'summary_fields'):
+                response[field.name] = related_obj.summary_fields()
         return response
 
     def related_fields(self, request):
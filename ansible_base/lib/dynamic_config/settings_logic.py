@@ -202,6 +202,8 @@ def get_dab_settings(
         # directionality is the same - adding or removing permissions
         # A value of False would result in more errors but be more conservative
         dab_data['ANSIBLE_BASE_EVALUATIONS_IGNORE_CONFLICTS'] = True
+        # Maximum number of role evaluations inserted or deleted in a single query
+        dab_data['ANSIBLE_BASE_EVALUATIONS_BATCH_SIZE'] = 1000
 
         # User flags that can grant permission before consulting roles
         dab_data['ANSIBLE_BASE_BYPASS_SUPERUSER_FLAGS'] = ['is_superuser']
@@ -1,5 +1,6 @@
 import logging
 from dataclasses import asdict, dataclass
+from functools import lru_cache
 from itertools import chain
 from typing import Optional
 
@@ -18,18 +19,24 @@ from ansible_base.lib.utils.string import make_json_safe
 logger = logging.getLogger('ansible_base.lib.utils.models')
 
 
-def get_all_field_names(model, concrete_only=False, include_attnames=True):
+def get_all_field_names(model, concrete_only=False, include_attnames=True) -> frozenset[str]:
     # Implements compatibility with _meta.get_all_field_names
     # See: https://docs.djangoproject.com/en/1.11/ref/models/meta/#migrating-from-the-old-api
-    return list(
-        set(
-            chain.from_iterable(
-                (field.name, field.attname) if include_attnames and hasattr(field, 'attname') else (field.name,)
-                for field in model._meta.get_fields()
-                # For complete backwards compatibility, you may want to exclude
-                # GenericForeignKey from the results.
-                if not (field.many_to_one and field.related_model is None) and not (concrete_only and not field.concrete)
-            )
+    # Model instances are accepted, but the answer only depends on the class, which is cached
+    if isinstance(model, models.Model):
+        model = type(model)
+    return _get_all_field_names(model, concrete_only, include_attnames)
+
+
+@lru_cache(maxsize=None)
+def _get_all_field_names(model, concrete_only, include_attnames) -> frozenset[str]:
+    return frozenset(
+        chain.from_iterable(
+            (field.name, field.attname) if include_attnames and hasattr(field, 'attname') else (field.name,)
+            for field in model._meta.get_fields()
+            # For complete backwards compatibility, you may want to exclude
+            # GenericForeignKey from the results.
+            if not (field.many_to_one and field.related_model is None) and not (concrete_only and not field.concrete)
         )
     )
 
@@ -28,7 +28,8 @@ class ChoiceLikeMixin(serializers.ChoiceField):
     def get_dynamic_choices(self):
         raise NotImplementedError
 
-    def get_dynamic_object(self, data):
+    def get_dynamic_object(self, data, lookup=None):
+        "lookup is an optional result of get_dynamic_objects, if the field class implements that"
         raise NotImplementedError
 
     def to_representation(self, value):
@@ -43,10 +44,16 @@ class ChoiceLikeMixin(serializers.ChoiceField):
         super(serializers.ChoiceField, self).__init__(**kwargs)
 
     def _initialize_choices(self):
-        choices = self.get_dynamic_choices()
-        self._grouped_choices = to_choices_dict(choices)
-        self._choices = flatten_choices_dict(self._grouped_choices)
-        self.choice_strings_to_values = {str(k): k for k in self._choices}
+        """Choices only depend on the models in the permission registry, which can not change after startup
+
+        So these are computed once for each field class and shared by all of its instances.
+        """
+        cls = type(self)
+        if '_choice_dicts' not in cls.__dict__:
+            grouped_choices = to_choices_dict(self.get_dynamic_choices())
+            choices = flatten_choices_dict(grouped_choices)
+            cls._choice_dicts = (grouped_choices, choices, {str(k): k for k in choices})
+        self._grouped_choices, self._choices, self.choice_strings_to_values = cls._choice_dicts
 
     @cached_property
     def grouped_choices(self):
@@ -58,9 +65,9 @@ class ChoiceLikeMixin(serializers.ChoiceField):
         self._initialize_choices()
         return self._choices
 
-    def to_internal_value(self, data):
+    def to_internal_value(self, data, lookup=None):
         try:
-            return self.get_dynamic_object(data)
+            return self.get_dynamic_object(data, lookup=lookup)
         except ObjectDoesNotExist:
             self.fail('does_not_exist', pk_value=data)
         except (TypeError, ValueError):
@@ -78,8 +85,8 @@ class ContentTypeField(ChoiceLikeMixin):
     def get_dynamic_choices(self):
         return list(sorted((self.get_resource_type_name(cls), cls._meta.verbose_name.title()) for cls in permission_registry.all_registered_models))
 
-    def get_dynamic_object(self, data):
-        model = data.rsplit('.')[-1]
+    def get_dynamic_object(self, data, lookup=None):
+        model = data.rpartition('.')[2]
         cls = permission_registry.get_model_by_name(model)
         if cls is None:
             return permission_registry.content_type_model.objects.none().get()  # raises correct DoesNotExist
@@ -101,16 +108,35 @@ class PermissionField(ChoiceLikeMixin):
     def get_dynamic_choices(self):
         perms = []
         for cls in permission_registry.all_registered_models:
+            # resource prefix requires a lookup in the resource registry, so only do this once per model
+            prefix = permission_registry.get_resource_prefix(cls)
             cls_name = cls._meta.model_name
-            for action in cls._meta.default_permissions:
-                perms.append(f'{permission_registry.get_resource_prefix(cls)}.{action}_{cls_name}')
-            for perm_name, description in cls._meta.permissions:
-                perms.append(f'{permission_registry.get_resource_prefix(cls)}.{perm_name}')
-        return list(sorted(perms))
+            perms.extend(f'{prefix}.{action}_{cls_name}' for action in cls._meta.default_permissions)
+            perms.extend(f'{prefix}.{perm_name}' for perm_name, description in cls._meta.permissions)
+        return sorted(perms)
 
-    def get_dynamic_object(self, data):
-        codename = data.rsplit('.')[-1]
-        return permission_registry.permission_qs.get(codename=codename)
+    def get_dynamic_objects(self, data_list) -> dict:
+        """Look up the permissions for a list of API names in one query, returns a dict keyed by codename
+
+        Codenames are only unique together with the content type, a codename shared by several
+        permissions maps to None so that get_dynamic_object looks it up on its own.
+        """
+        codenames = set(data.rpartition('.')[2] for data in data_list)
+        lookup = {}
+        # validation of permissions looks at the content_type of each, so fetch it in the same query
+        for perm in permission_registry.permission_qs.select_related('content_type').filter(codename__in=codenames):
+            lookup[perm.codename] = None if perm.codename in lookup else perm
+        return lookup
+
+    def get_dynamic_object(self, data, lookup=None):
+        codename = data.rpartition('.')[2]
+        if lookup is not None:
+            if codename not in lookup:
+                raise permission_registry.permission_qs.model.DoesNotExist
+            if lookup[codename] is not None:
+                return lookup[codename]
+        # validation of permissions looks at the content_type of each, so fetch it in the same query
+        return permission_registry.permission_qs.select_related('content_type').get(codename=codename)
 
     def to_representation(self, value):
         if isinstance(value, str):
@@ -122,7 +148,27 @@ class PermissionField(ChoiceLikeMixin):
 class ManyRelatedListField(serializers.ListField):
     def to_representation(self, data):
         "Adds the .all() to treat the value as a queryset"
-        return [self.child.to_representation(item) if item is not None else None for item in data.all()]
+        # .all() rather than .iterator() so that prefetched permissions from the list view are used
+        child_repr = self.child.to_representation
+        return [child_repr(item) for item in data.all()]
+
+    def run_child_validation(self, data):
+        "If the child can, look up all of the items in one query instead of one query per item"
+        if not (hasattr(self.child, 'get_dynamic_objects') and all(isinstance(item, str) for item in data)):
+            return super().run_child_validation(data)
+        lookup = self.child.get_dynamic_objects(data)
+        result = []
+        errors = {}
+        for idx, item in enumerate(data):
+            try:
+                value = self.child.to_internal_value(item, lookup=lookup)
+                self.child.run_validators(value)
+                result.append(value)
+            except ValidationError as e:
+                errors[idx] = e.detail
+        if errors:
+            raise ValidationError(errors)
+        return result
 
 
 class RoleDefinitionSerializer(CommonModelSerializer):
@@ -142,7 +188,7 @@ class RoleDefinitionSerializer(CommonModelSerializer):
         if 'permissions' in validated_data:
             permissions = validated_data['permissions']
         else:
-            permissions = list(self.instance.permissions.all())
+            permissions = list(self.instance.permissions.select_related('content_type'))
         if 'content_type' in validated_data:
             content_type = validated_data['content_type']
         else:
@@ -189,50 +235,55 @@ class BaseAssignmentSerializer(CommonModelSerializer):
             raise ValidationError({for_field: _('Django-ansible-base resource registry must be installed to use ansible_id fields')})
 
         try:
-            resource = resource_cls.objects.get(ansible_id=ansible_id)
+            # only the generic foreign key fields are needed to find the object
+            resource = resource_cls.objects.only('content_type', 'object_id').get(ansible_id=ansible_id)
             # Ensure that the request user has permission to view provided data
-            obj = resource.content_object
-            if obj._meta.model_name == 'user':
-                if not visible_users(requesting_user).filter(pk=obj.pk).exists():
+            model = permission_registry.content_type_model.objects.get_for_id(resource.content_type_id).model_class()
+            if model._meta.model_name == 'user':
+                # fetch the user from the visible queryset, which also does the visibility check
+                obj = visible_users(requesting_user).filter(pk=resource.object_id).first()
+                if obj is None:
+                    raise ObjectDoesNotExist
+            else:
+                obj = resource.content_object
+                if not requesting_user.has_obj_perm(obj, 'view'):
                     raise ObjectDoesNotExist
-            elif not requesting_user.has_obj_perm(obj, 'view'):
-                raise ObjectDoesNotExist
         except ObjectDoesNotExist:
             msg = serializers.PrimaryKeyRelatedField.default_error_messages['does_not_exist']
             raise ValidationError({for_field: msg.format(pk_value=ansible_id)})
-        return resource.content_object
+        return obj
 
     def get_actor_from_data(self, validated_data, requesting_user):
         actor_aid_field = f'{self.actor_field}_ansible_id'
-        if validated_data.get(self.actor_field) and validated_data.get(actor_aid_field):
+        actor = validated_data.get(self.actor_field)
+        ansible_id = validated_data.get(actor_aid_field)
+        if bool(actor) == bool(ansible_id):
             self.raise_id_fields_error(self.actor_field, actor_aid_field)
-        elif validated_data.get(self.actor_field):
-            actor = validated_data[self.actor_field]
-        elif ansible_id := validated_data.get(actor_aid_field):
+        if ansible_id:
             actor = self.get_by_ansible_id(ansible_id, requesting_user, for_field=actor_aid_field)
-        else:
-            self.raise_id_fields_error(self.actor_field, f'{self.actor_field}_ansible_id')
         return actor
 
     def get_object_from_data(self, validated_data, role_definition, requesting_user):
         obj = None
-        if validated_data.get('object_id') and validated_data.get('object_ansible_id'):
+        object_id = validated_data.get('object_id')
+        object_ansible_id = validated_data.get('object_ansible_id')
+        if object_id and object_ansible_id:
             self.raise_id_fields_error('object_id', 'object_ansible_id')
-        elif validated_data.get('object_id'):
-            if not role_definition.content_type:
+        elif object_id:
+            if not role_definition.content_type_id:
                 raise ValidationError({'object_id': _('System role does not allow for object assignment')})
-            model = role_definition.content_type.model_class()
+            model = permission_registry.content_type_model.objects.get_for_id(role_definition.content_type_id).model_class()
             try:
-                obj = serializers.PrimaryKeyRelatedField(queryset=model.access_qs(requesting_user)).to_internal_value(validated_data['object_id'])
+                obj = serializers.PrimaryKeyRelatedField(queryset=model.access_qs(requesting_user)).to_internal_value(object_id)
             except ValidationError as exc:
                 raise ValidationError({'object_id': exc.detail})
             except AttributeError:
                 if not permission_registry.is_registered(model):
                     raise ValidationError({'role_definition': 'Given role definition is for a model not registered in the permissions system'})
                 raise  # in this case no idea what went wrong
-        elif validated_data.get('object_ansible_id'):
-            obj = self.get_by_ansible_id(validated_data.get('object_ansible_id'), requesting_user, for_field='object_ansible_id')
-            if permission_registry.content_type_model.objects.get_for_model(obj) != role_definition.content_type:
+        elif object_ansible_id:
+            obj = self.get_by_ansible_id(object_ansible_id, requesting_user, for_field='object_ansible_id')
+            if permission_registry.get_content_type_id(obj) != role_definition.content_type_id:
                 raise ValidationError(
                     {
                         'object_ansible_id': _('Object type of %(model_name)s does not match role type of %(role_definition)s')
@@ -261,7 +312,7 @@ class BaseAssignmentSerializer(CommonModelSerializer):
         # Return a 400 if the role is not managed locally
         check_locally_managed(rd)
 
-        if rd.content_type:
+        if rd.content_type_id:
             # Object role assignment
             if not obj:
                 raise ValidationError({'object_id': _('Object must be specified for this role assignment')})
@@ -56,17 +56,21 @@ class RoleMetadataView(AnsibleBaseDjangoAppApiView, GenericAPIView):
         role_model_types = list(all_models)
         if system_roles_enabled():
             role_model_types += [None]
-        for cls in role_model_types:
+        codenames_by_type = {cls: list_combine_values(permissions_allowed_for_role(cls)) for cls in role_model_types}
+
+        # Look up the content type of every permission in one query
+        all_codenames = set(codename for codenames in codenames_by_type.values() for codename in codenames)
+        perm_ct_ids = dict(permission_registry.permission_qs.filter(codename__in=all_codenames).values_list('codename', 'content_type_id'))
+
+        for cls, codenames in codenames_by_type.items():
             if cls is None:
                 cls_repr = 'system'
             else:
                 cls_repr = f"{permission_registry.get_resource_prefix(cls)}.{cls._meta.model_name}"
             allowed_permissions[cls_repr] = []
-            for codename in list_combine_values(permissions_allowed_for_role(cls)):
-                perm = permission_registry.permission_qs.get(codename=codename)
-                ct = permission_registry.content_type_model.objects.get_for_id(perm.content_type_id)
-                perm_repr = f"{permission_registry.get_resource_prefix(ct.model_class())}.{codename}"
-                allowed_permissions[cls_repr].append(perm_repr)
+            for codename in codenames:
+                ct = permission_registry.content_type_model.objects.get_for_id(perm_ct_ids[codename])
+                allowed_permissions[cls_repr].append(f"{permission_registry.get_resource_prefix(ct.model_class())}.{codename}")
 
         data['allowed_permissions'] = allowed_permissions
 
@@ -86,7 +90,7 @@ class RoleDefinitionViewSet(AnsibleBaseDjangoAppApiView, ModelViewSet):
     but can be assigned to users.
     """
 
-    queryset = RoleDefinition.objects.prefetch_related('created_by', 'modified_by', 'content_type', 'permissions')
+    queryset = RoleDefinition.objects.select_related('created_by', 'modified_by', 'content_type').prefetch_related('permissions')
     serializer_class = RoleDefinitionSerializer
     permission_classes = [RoleDefinitionPermissions]
 
@@ -108,18 +112,22 @@ class RoleDefinitionViewSet(AnsibleBaseDjangoAppApiView, ModelViewSet):
         return super().perform_destroy(instance)
 
 
-assignment_prefetch_base = ('content_object', 'content_type', 'role_definition', 'created_by', 'object_role')
+# Foreign keys are joined, the generic content_object can only be prefetched
+# object_role is internal and not rendered, its object_id, content_type, and role_definition are copied to the assignment
+assignment_select_base = ('content_type', 'role_definition', 'created_by')
+assignment_prefetch_base = ('content_object',)
 
 
 class BaseAssignmentViewSet(AnsibleBaseDjangoAppApiView, ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
     # PUT and PATCH are not allowed because these are immutable
     http_method_names = ['get', 'post', 'head', 'options', 'delete']
+    select_related = ()
     prefetch_related = ()
 
     def get_queryset(self):
         model = self.serializer_class.Meta.model
-        return model.objects.prefetch_related(*self.prefetch_related, *assignment_prefetch_base)
+        return model.objects.select_related(*self.select_related, *assignment_select_base).prefetch_related(*self.prefetch_related, *assignment_prefetch_base)
 
     def filter_queryset(self, qs):
         model = self.serializer_class.Meta.model
@@ -157,7 +165,7 @@ class RoleTeamAssignmentViewSet(BaseAssignmentViewSet):
     """
 
     serializer_class = RoleTeamAssignmentSerializer
-    prefetch_related = ('team',)
+    select_related = ('team',)
 
 
 class RoleUserAssignmentViewSet(BaseAssignmentViewSet):
@@ -173,4 +181,4 @@ class RoleUserAssignmentViewSet(BaseAssignmentViewSet):
     """
 
     serializer_class = RoleUserAssignmentSerializer
-    prefetch_related = ('user',)
+    select_related = ('user',)
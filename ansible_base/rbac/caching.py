@@ -1,9 +1,10 @@
 import logging
-from collections import defaultdict
+from collections import defaultdict, deque
 from typing import Optional
 from uuid import UUID
 
 from django.conf import settings
+from django.db.models import Prefetch
 
 from ansible_base.rbac.models import ObjectRole, RoleDefinition, RoleEvaluation, RoleEvaluationUUID
 from ansible_base.rbac.permission_registry import permission_registry
@@ -31,19 +32,21 @@ def all_team_parents(team_id: int, team_team_parents: dict, seen: Optional[set]
 
     team_id: id of the team we want to get the direct and indirect parents of
     team_team_parents: mapping of team id to ids of its parents, this is not modified by this method
-    seen: mutable set that will be added to by each call so that we can not recurse infinitely
+    seen: mutable set of teams already visited, so that we do not loop infinitely
     """
     parent_team_ids = set()
     if seen is None:
         seen = set()
-    for parent_id in team_team_parents.get(team_id, []):
-        if parent_id in seen:
-            # will be combined in a lower level of the call stack
-            # this condition prevents infinite recursion in the event of loops in the graph
-            continue
-        parent_team_ids.add(parent_id)
-        seen.add(parent_id)
-        parent_team_ids.update(all_team_parents(parent_id, team_team_parents, seen=seen))
+    # breadth-first walk up the graph, iterative so that deep team hierarchies do not hit the recursion limit
+    to_visit = deque([team_id])
+    while to_visit:
+        for parent_id in team_team_parents.get(to_visit.popleft(), []):
+            if parent_id in seen:
+                # this condition prevents infinite looping in the event of loops in the graph
+                continue
+            parent_team_ids.add(parent_id)
+            seen.add(parent_id)
+            to_visit.append(parent_id)
     return parent_team_ids
 
 
@@ -56,69 +59,55 @@ def get_org_team_mapping() -> dict[int, list[int]]:
         }
     """
     org_team_mapping = defaultdict(list)
-    team_fields = ['id']
     team_parent_fd = permission_registry.get_parent_fd_name(permission_registry.team_model)
     if team_parent_fd:
-        team_fields.append(f'{team_parent_fd}_id')
-        for team in permission_registry.team_model.objects.only(*team_fields):
-            team_parent_id = getattr(team, f'{team_parent_fd}_id')
-            org_team_mapping[team_parent_id].append(team.id)
+        # plain tuples, no model instances are needed to build this
+        for team_parent_id, team_id in permission_registry.team_model.objects.values_list(f'{team_parent_fd}_id', 'id'):
+            org_team_mapping[team_parent_id].append(team_id)
     return org_team_mapping
 
 
-def get_direct_team_member_roles(org_team_mapping: dict) -> dict[int, list[int]]:
+def get_team_member_roles_and_parents(org_team_mapping: dict) -> tuple[dict[int, list[int]], dict[int, list[int]]]:
     """
     If an organization-level role lists "member_team" permission, that confers
     several team's permissions to users who holds an org role of that type.
     If a team-level role lists "member_team" then that also convers
     the member permissions to the user.
+    Both mappings are built from the same query of roles that list "member_team".
+
+    The first returned dictionary has teams as keys and the object role ids that give membership as values.
     These do not yet consider teams-of-teams, so these are "direct" membership roles to a team.
-    Returns a dictionary with teams as keys and the object role ids that give membership as values.
         {
             team_id: [role_id, role_id, ...],
             team_id: [role_id, ...]
         }
-    """
-    direct_member_roles = defaultdict(list)
-    for object_role in ObjectRole.objects.filter(role_definition__permissions__codename=permission_registry.team_permission).iterator():
-        if object_role.content_type_id == permission_registry.team_ct_id:
-            direct_member_roles[int(object_role.object_id)].append(object_role.id)
-        elif object_role.content_type_id == permission_registry.org_ct_id:
-            object_id = int(object_role.object_id)
-            if object_id not in org_team_mapping:
-                continue  # this means the organization has no team but has member_team as a listed permission
-            for team_id in org_team_mapping[object_id]:
-                direct_member_roles[team_id].append(object_role.id)
-        else:
-            logger.warning(f'{object_role} gives {permission_registry.team_permission} to an invalid type')
-    return direct_member_roles
-
-
-def get_parent_teams_of_teams(org_team_mapping: dict) -> dict[int, list[int]]:
-    """
-    Returns a dictionary showing the teams-of-teams relationships in the system
+    The second returned dictionary shows the teams-of-teams relationships in the system
     this happens when a member_team role confers membership to another team.
         {
             team_id: [parent_team_id, parent_team_id, ...],
             team_id: []
         }
-    The queryset and logic is similar to get_direct_team_member_roles but
-    optimizations are different.
     """
+    direct_member_roles = defaultdict(list)
     team_team_parents = defaultdict(list)
-    for object_role in ObjectRole.objects.filter(
-        role_definition__permissions__codename=permission_registry.team_permission, teams__isnull=False
-    ).prefetch_related('teams'):
-        for actor_team in object_role.teams.all():
-            if object_role.content_type_id == permission_registry.team_ct_id:
-                team_team_parents[int(object_role.object_id)].append(actor_team.id)
-            elif object_role.content_type_id == permission_registry.org_ct_id:
-                object_id = int(object_role.object_id)
-                if object_id not in org_team_mapping:
-                    continue  # again, means the organization has no team but has member_team as a listed permission
-                for team_id in org_team_mapping[object_id]:
-                    team_team_parents[team_id].append(actor_team.id)
-    return team_team_parents
+    member_team_roles = ObjectRole.objects.filter(role_definition__permissions__codename=permission_registry.team_permission).prefetch_related(
+        Prefetch('teams', queryset=permission_registry.team_model.objects.only('id'))
+    )
+    for object_role in member_team_roles:
+        if object_role.content_type_id == permission_registry.team_ct_id:
+            team_ids = [int(object_role.object_id)]
+        elif object_role.content_type_id == permission_registry.org_ct_id:
+            # organization may have no team but still have member_team as a listed permission
+            team_ids = org_team_mapping.get(int(object_role.object_id), [])
+        else:
+            logger.warning('%s gives %s to an invalid type', object_role, permission_registry.team_permission)
+            continue
+        actor_team_ids = [actor_team.id for actor_team in object_role.teams.all()]
+        for team_id in team_ids:
+            direct_member_roles[team_id].append(object_role.id)
+            if actor_team_ids:
+                team_team_parents[team_id].extend(actor_team_ids)
+    return direct_member_roles, team_team_parents
 
 
 def compute_team_member_roles():
@@ -127,14 +116,18 @@ def compute_team_member_roles():
     This relationship is a list of teams that the role grants membership for
     This method is always ran globally.
     """
+    through_model = ObjectRole.provides_teams.through
+    if not ObjectRole.objects.filter(role_definition__permissions__codename=permission_registry.team_permission).exists():
+        # No role gives team membership, so no team should be linked to any role, skip computing the team graph
+        through_model.objects.all().delete()
+        return
+
     # Manually prefetch the team to org memberships
     org_team_mapping = get_org_team_mapping()
 
-    # Build out the direct member roles for teams
-    direct_member_roles = get_direct_team_member_roles(org_team_mapping)
-
-    # Build a team-to-team child-to-parents mapping for teams that have permission to other teams
-    team_team_parents = get_parent_teams_of_teams(org_team_mapping)
+    # Build out the direct member roles for teams, and
+    # a team-to-team child-to-parents mapping for teams that have permission to other teams
+    direct_member_roles, team_team_parents = get_team_member_roles_and_parents(org_team_mapping)
 
     # Now we need to crawl the team-team graph to get the full list of roles that grants access to each team
     # for each parent team that grants membership to a team, we need to add the roles that grant
@@ -146,42 +139,31 @@ def compute_team_member_roles():
             all_member_roles[team_id].update(set(direct_member_roles.get(parent_team_id, [])))
 
     # Great! we should be done building all_member_roles which tells what roles gives team membership for all teams
-    # now at this point we save that data
-    for team in permission_registry.team_model.objects.prefetch_related('member_roles'):
-        # NOTE: the .set method will not use the prefetched data, thus the messy implementation here
-        existing_ids = set(r.id for r in team.member_roles.all())
-        expected_ids = set(all_member_roles.get(team.id, []))
-        to_add = expected_ids - existing_ids
-        to_remove = existing_ids - expected_ids
-        if to_add:
-            team.member_roles.add(*to_add)
-        if to_remove:
-            team.member_roles.remove(*to_remove)
+    # now at this point we save that data, diffing against the through table directly so that the
+    # number of queries does not depend on the number of teams
+    role_fd = f'{ObjectRole.provides_teams.field.m2m_field_name()}_id'
+    team_fd = f'{ObjectRole.provides_teams.field.m2m_reverse_field_name()}_id'
+    existing_links = {(team_id, role_id): link_id for link_id, team_id, role_id in through_model.objects.values_list('id', team_fd, role_fd)}
+    # roles for a team may outlive the team while it is being deleted, so only link teams that exist
+    team_ids = set(permission_registry.team_model.objects.values_list('pk', flat=True))
+    expected_links = set((team_id, role_id) for team_id, role_ids in all_member_roles.items() if team_id in team_ids for role_id in role_ids)
+
+    batch_size = settings.ANSIBLE_BASE_EVALUATIONS_BATCH_SIZE
+    to_add = [through_model(**{team_fd: team_id, role_fd: role_id}) for team_id, role_id in expected_links - existing_links.keys()]
+    if to_add:
+        through_model.objects.bulk_create(to_add, batch_size=batch_size, ignore_conflicts=True)
+    to_remove = sorted(existing_links[link] for link in existing_links.keys() - expected_links)
+    for i in range(0, len(to_remove), batch_size):
+        through_model.objects.filter(id__in=to_remove[i : i + batch_size]).delete()
 
 
-def compute_object_role_permissions(object_roles=None, types_prefetch=None):
+def save_evaluation_changes(to_delete: set, to_add: list) -> None:
     """
-    Assumes the ObjectRole.provides_teams relationship is correct.
-    Makes the RoleEvaluation table correct for all specified object_roles
+    Saves the changes from ObjectRole.needed_cache_updates for any number of object roles
+    to_delete: set of (evaluation id, object id type) tuples of evaluations to delete
+    to_add: list of unsaved evaluations to create
     """
-    to_delete = set()
-    to_add = []
-
-    if types_prefetch is None:
-        types_prefetch = TypesPrefetch.from_database(RoleDefinition)
-    if object_roles is None:
-        object_roles = ObjectRole.objects.iterator()
-
-    for object_role in object_roles:
-        role_to_delete, role_to_add = object_role.needed_cache_updates(types_prefetch=types_prefetch)
-
-        if role_to_delete:
-            logger.debug(f'Removing {len(role_to_delete)} object-permissions from {object_role}')
-            to_delete.update(role_to_delete)
-
-        if role_to_add:
-            logger.debug(f'Adding {len(role_to_add)} object-permissions to {object_role}')
-            to_add.extend(role_to_add)
+    batch_size = settings.ANSIBLE_BASE_EVALUATIONS_BATCH_SIZE
 
     if to_add:
         logger.info(f'Adding {len(to_add)} object-permission records')
@@ -195,9 +177,9 @@ def compute_object_role_permissions(object_roles=None, types_prefetch=None):
             else:
                 raise RuntimeError(f'Could not find a place in cache for {evaluation}')
         if to_add_int:
-            RoleEvaluation.objects.bulk_create(to_add_int, ignore_conflicts=settings.ANSIBLE_BASE_EVALUATIONS_IGNORE_CONFLICTS)
+            RoleEvaluation.objects.bulk_create(to_add_int, batch_size=batch_size, ignore_conflicts=settings.ANSIBLE_BASE_EVALUATIONS_IGNORE_CONFLICTS)
         if to_add_uuid:
-            RoleEvaluationUUID.objects.bulk_create(to_add_uuid, ignore_conflicts=settings.ANSIBLE_BASE_EVALUATIONS_IGNORE_CONFLICTS)
+            RoleEvaluationUUID.objects.bulk_create(to_add_uuid, batch_size=batch_size, ignore_conflicts=settings.ANSIBLE_BASE_EVALUATIONS_IGNORE_CONFLICTS)
 
     if to_delete:
         logger.info(f'Deleting {len(to_delete)} object-permission records')
@@ -210,7 +192,45 @@ def compute_object_role_permissions(object_roles=None, types_prefetch=None):
                 to_delete_uuid.append(evaluation_id)
             else:
                 raise RuntimeError(f'Unexpected type to delete {evaluation_id}-{evaluation_type}')
-        if to_delete_int:
-            RoleEvaluation.objects.filter(id__in=to_delete_int).delete()
-        if to_delete_uuid:
-            RoleEvaluationUUID.objects.filter(id__in=to_delete_uuid).delete()
+        # sorted so that each batch deletes a contiguous range of the primary key index
+        to_delete_int.sort()
+        to_delete_uuid.sort()
+        for i in range(0, len(to_delete_int), batch_size):
+            RoleEvaluation.objects.filter(id__in=to_delete_int[i : i + batch_size]).delete()
+        for i in range(0, len(to_delete_uuid), batch_size):
+            RoleEvaluationUUID.objects.filter(id__in=to_delete_uuid[i : i + batch_size]).delete()
+
+
+def compute_object_role_permissions(object_roles=None, types_prefetch=None):
+    """
+    Assumes the ObjectRole.provides_teams relationship is correct.
+    Makes the RoleEvaluation table correct for all specified object_roles
+    """
+    to_delete = set()
+    to_add = []
+
+    if object_roles is None:
+        object_roles = ObjectRole.objects.iterator()
+
+    for object_role in object_roles:
+        if types_prefetch is None:
+            # loaded on first use, triggers often have no roles to update and then this is not needed
+            types_prefetch = TypesPrefetch.from_database(RoleDefinition)
+        role_to_delete, role_to_add = object_role.needed_cache_updates(types_prefetch=types_prefetch)
+
+        if role_to_delete:
+            # formatting arguments are passed so the object role is only rendered if debug logging is enabled
+            logger.debug('Removing %s object-permissions from %s', len(role_to_delete), object_role)
+            to_delete.update(role_to_delete)
+
+        if role_to_add:
+            logger.debug('Adding %s object-permissions to %s', len(role_to_add), object_role)
+            to_add.extend(role_to_add)
+
+        # Changes for different roles are independent, so save as we go to keep memory bounded for global recomputes
+        if len(to_delete) + len(to_add) >= settings.ANSIBLE_BASE_EVALUATIONS_BATCH_SIZE:
+            save_evaluation_changes(to_delete, to_add)
+            to_delete = set()
+            to_add = []
+
+    save_evaluation_changes(to_delete, to_add)
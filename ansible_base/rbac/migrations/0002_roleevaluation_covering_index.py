@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-15 23:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dab_rbac', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='roleevaluation',
+            name='dab_rbac_ro_role_id_604bc4_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='roleevaluationuuid',
+            name='dab_rbac_ro_role_id_237936_idx',
+        ),
+        migrations.AddIndex(
+            model_name='roleevaluation',
+            index=models.Index(fields=['role', 'content_type_id', 'object_id', 'codename'], name='dab_rbac_ro_role_id_c66eb1_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roleevaluationuuid',
+            index=models.Index(fields=['role', 'content_type_id', 'object_id', 'codename'], name='dab_rbac_ro_role_id_1fd518_idx'),
+        ),
+    ]
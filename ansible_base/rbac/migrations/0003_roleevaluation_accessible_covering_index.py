@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-16 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dab_rbac', '0002_roleevaluation_covering_index'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='roleevaluation',
+            name='dab_rbac_ro_role_id_8b9faf_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='roleevaluationuuid',
+            name='dab_rbac_ro_role_id_4fe905_idx',
+        ),
+        migrations.AddIndex(
+            model_name='roleevaluation',
+            index=models.Index(fields=['role', 'content_type_id', 'codename', 'object_id'], name='dab_rbac_ro_role_id_d5afa0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='roleevaluationuuid',
+            index=models.Index(fields=['role', 'content_type_id', 'codename', 'object_id'], name='dab_rbac_ro_role_id_91c5ab_idx'),
+        ),
+    ]
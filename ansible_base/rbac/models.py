@@ -1,6 +1,8 @@
 import logging
 from collections.abc import Iterable
+from functools import lru_cache
 from typing import Optional, Type
+from uuid import UUID
 
 # Django
 from django.conf import settings
@@ -22,7 +24,7 @@ from ansible_base.lib.abstract_models.common import CommonModel, ImmutableCommon
 from ansible_base.lib.utils.models import is_add_perm
 from ansible_base.rbac.permission_registry import permission_registry
 from ansible_base.rbac.prefetch import TypesPrefetch
-from ansible_base.rbac.validators import validate_assignment, validate_permissions_for_model
+from ansible_base.rbac.validators import codenames_for_cls, validate_assignment, validate_permissions_for_model
 
 logger = logging.getLogger('ansible_base.rbac.models')
 
@@ -93,22 +95,31 @@ class RoleDefinitionManager(models.Manager):
         # User should get permissions to the object and any child objects under it
         model_and_children = set(cls for rel, cls in permission_registry.get_child_models(obj))
         model_and_children.add(type(obj))
-        cts = ContentType.objects.get_for_models(*model_and_children).values()
-
-        needed_perms = set()
-        for perm in DABPermission.objects.filter(content_type__in=cts).prefetch_related('content_type'):
-            action = perm.codename.split('_', 1)[0]
-            if action in needed_actions:
+        cts_by_model = ContentType.objects.get_for_models(*model_and_children)
+        cts = cts_by_model.values()
+
+        # Work out the wanted codenames from model metadata, so the query only returns permissions we keep
+        wanted_codenames = set()
+        for cls in model_and_children:
+            for codename in codenames_for_cls(cls):
+                if codename.partition('_')[0] not in needed_actions:
+                    continue
                 # do not save add permission on the object level, which does not make sense
-                if is_add_perm(perm.codename) and perm.content_type.model == obj._meta.model_name:
+                if is_add_perm(codename) and cls._meta.model_name == obj._meta.model_name:
                     continue
-                needed_perms.add(perm.codename)
+                wanted_codenames.add(codename)
+        needed_perms = set(DABPermission.objects.filter(content_type__in=cts, codename__in=wanted_codenames).values_list('codename', flat=True))
+
+        if not needed_perms:
+            return
 
-        has_permissions = set(RoleEvaluation.get_permissions(user, obj))
-        has_permissions.update(user.singleton_permissions())
-        if set(needed_perms) - set(has_permissions):
+        # System-wide permissions are cached on the user, so only query object permissions if those are not enough
+        has_permissions = set(user.singleton_permissions())
+        if not needed_perms <= has_permissions:
+            has_permissions.update(RoleEvaluation.get_permissions(user, obj))
+        if not needed_perms <= has_permissions:
             kwargs = {'permissions': needed_perms, 'name': settings.ANSIBLE_BASE_ROLE_CREATOR_NAME.format(obj=obj, cls=type(obj))}
-            defaults = {'content_type': ContentType.objects.get_for_model(obj)}
+            defaults = {'content_type': cts_by_model[type(obj)]}
             try:
                 rd, _ = self.get_or_create(defaults=defaults, **kwargs)
             except ValidationError:
@@ -122,10 +133,25 @@ class RoleDefinitionManager(models.Manager):
         "Add extra feature on top of existing get_or_create to use permissions list"
         if permissions:
             permissions = set(permissions)
-            for existing_rd in self.prefetch_related('permissions'):
-                existing_set = set(perm.codename for perm in existing_rd.permissions.all())
-                if existing_set == permissions:
-                    return (existing_rd, False)
+            # A matching role must list any one of the codenames, use the through table index to
+            # narrow down candidates so that the counts below are not computed for every role
+            permissions_field = self.model.permissions.field
+            candidate_ids = permissions_field.remote_field.through.objects.filter(
+                **{f'{permissions_field.m2m_reverse_field_name()}__codename': min(permissions)}
+            ).values(permissions_field.m2m_field_name())
+            # Let the database find a role whose codename set is exactly the requested set
+            # all listed codenames must match, and the role may not have any other codenames
+            existing_rd = (
+                self.filter(pk__in=candidate_ids)
+                .annotate(
+                    perm_ct=models.Count('permissions__codename', distinct=True),
+                    match_ct=models.Count('permissions__codename', distinct=True, filter=models.Q(permissions__codename__in=permissions)),
+                )
+                .filter(perm_ct=len(permissions), match_ct=len(permissions))
+                .first()
+            )
+            if existing_rd:
+                return (existing_rd, False)
             create_kwargs = kwargs.copy()
             if defaults:
                 create_kwargs.update(defaults)
@@ -134,11 +160,16 @@ class RoleDefinitionManager(models.Manager):
 
     def create_from_permissions(self, permissions=(), **kwargs):
         "Create from a list of text-type permissions and do validation"
-        perm_list = [permission_registry.permission_qs.get(codename=str_perm) for str_perm in permissions]
+        permissions = set(permissions)
+        perm_list = list(permission_registry.permission_qs.filter(codename__in=permissions).select_related('content_type'))
+        missing_codenames = permissions - {perm.codename for perm in perm_list}
+        if missing_codenames:
+            # same error type as fetching permissions individually, which some callers may expect
+            raise DABPermission.DoesNotExist(f'Permissions do not exist: {", ".join(sorted(missing_codenames))}')
 
         ct = kwargs.get('content_type', None)
         if kwargs.get('content_type_id', None):
-            ct = ContentType.objects.get(id=kwargs['content_type_id'])
+            ct = ContentType.objects.get_for_id(kwargs['content_type_id'])
 
         validate_permissions_for_model(perm_list, ct, managed=kwargs.get('managed', False))
 
@@ -249,10 +280,10 @@ class RoleDefinition(CommonModel):
     def give_or_remove_permission(self, actor, content_object, giving=True, sync_action=False):
         "Shortcut method to do whatever needed to give user or team these permissions"
         validate_assignment(self, actor, content_object)
-        obj_ct = ContentType.objects.get_for_model(content_object)
+        obj_ct_id = permission_registry.get_content_type_id(content_object)
         # sanitize the object_id to its database version, practically, remove "-" chars from uuids
         object_id = content_object._meta.pk.get_db_prep_value(content_object.pk, connection)
-        kwargs = dict(role_definition=self, content_type=obj_ct, object_id=object_id)
+        kwargs = dict(role_definition=self, content_type_id=obj_ct_id, object_id=object_id)
 
         created = False
         object_role = ObjectRole.objects.filter(**kwargs).first()
@@ -277,7 +308,7 @@ class RoleDefinition(CommonModel):
             else:
                 object_role.teams.remove(actor)
 
-        if (not giving) and (not (object_role.users.exists() or object_role.teams.exists())):
+        if (not giving) and (not object_role.has_actors()):
             if object_role in to_update:
                 to_update.remove(object_role)
             object_role.delete()
@@ -335,32 +366,32 @@ class ObjectRoleFields(models.Model):
     content_object = GenericForeignKey('content_type', 'object_id')
 
     @classmethod
-    def _visible_items(cls, eval_cls, user, qs=None):
-        permission_qs = eval_cls.objects.filter(
-            role__in=user.has_roles.all(),
-            content_type_id=models.OuterRef('content_type_id'),
-        )
+    def visible_items(cls, user, qs=None):
+        "This shows assignments to both UUID and integer pk models"
+        # object ids from both evaluation tables are combined in one UNION subquery
         # NOTE: type casting is necessary in postgres but not sqlite3
         object_id_field = cls._meta.get_field('object_id')
-        obj_filter = models.Q(object_id__in=permission_qs.values_list(Cast('object_id', output_field=object_id_field)))
+        permission_qs_list = [
+            eval_cls.objects.filter(role_id__in=actor_role_ids(user), content_type_id=models.OuterRef('content_type_id')).values_list(
+                Cast('object_id', output_field=object_id_field)
+            )
+            for eval_cls in (RoleEvaluation, RoleEvaluationUUID)
+        ]
+        obj_filter = models.Q(object_id__in=permission_qs_list[0].union(permission_qs_list[1], all=True))
 
-        if not hasattr(user, '_singleton_permission_objs'):
-            user._singleton_permission_objs = RoleDefinition.user_global_permissions(user)
+        if not hasattr(user, '_singleton_ct_ids'):
+            # values_list makes this the content type ids of system-wide permissions, which is all that is needed here
+            permission_qs = DABPermission.objects.values_list('content_type_id', flat=True)
+            user._singleton_ct_ids = frozenset(RoleDefinition.user_global_permissions(user, permission_qs=permission_qs))
 
         if qs is None:
             qs = cls.objects.all()
 
-        if user._singleton_permission_objs:
-            super_ct_ids = set(perm.content_type_id for perm in user._singleton_permission_objs)
+        if user._singleton_ct_ids:
             # content_type=None condition: A good-enough rule - you can see other global assignments if you have any yourself
-            return qs.filter(obj_filter | models.Q(content_type__in=super_ct_ids) | models.Q(content_type=None))
+            return qs.filter(obj_filter | models.Q(content_type__in=user._singleton_ct_ids) | models.Q(content_type=None))
         return qs.filter(obj_filter)
 
-    @classmethod
-    def visible_items(cls, user, qs=None):
-        "This ORs querysets to show assignments to both UUID and integer pk models"
-        return cls._visible_items(RoleEvaluation, user, qs) | cls._visible_items(RoleEvaluationUUID, user, qs)
-
     @property
     def cache_id(self):
         "The ObjectRole GenericForeignKey is text, but cache needs to match models"
@@ -394,9 +425,15 @@ class AssignmentBase(ImmutableCommonModel, ObjectRoleFields):
 
         # Cache fields from the associated object_role
         if self.object_role_id and not self.object_id:
-            self.object_id = self.object_role.object_id
-            self.content_type_id = self.object_role.content_type_id
-            self.role_definition_id = self.object_role.role_definition_id
+            if self._meta.get_field('object_role').is_cached(self):
+                self.object_id = self.object_role.object_id
+                self.content_type_id = self.object_role.content_type_id
+                self.role_definition_id = self.object_role.role_definition_id
+            else:
+                # Created from the id alone, as in related manager adds, only the copied columns are needed
+                self.object_id, self.content_type_id, self.role_definition_id = (
+                    ObjectRole.objects.filter(pk=self.object_role_id).values_list('object_id', 'content_type_id', 'role_definition_id').get()
+                )
 
 
 class RoleUserAssignment(AssignmentBase):
@@ -494,7 +531,9 @@ class ObjectRole(ObjectRoleFields):
     )
 
     def __str__(self):
-        return f'ObjectRole(pk={self.id}, {self.content_type.model}={self.object_id})'
+        # get_for_id uses the in-process content type cache, so this does not query for every repr
+        model_name = ContentType.objects.get_for_id(self.content_type_id).model
+        return f'ObjectRole(pk={self.id}, {model_name}={self.object_id})'
 
     def save(self, *args, **kwargs):
         if self.id:
@@ -504,23 +543,37 @@ class ObjectRole(ObjectRoleFields):
     def summary_fields(self):
         return {'id': self.id}
 
+    def has_actors(self) -> bool:
+        "Tells whether any user or team is assigned this role, checking both relationships in one query"
+        return ObjectRole.objects.filter(pk=self.pk).filter(models.Q(users__isnull=False) | models.Q(teams__isnull=False)).exists()
+
     def descendent_roles(self):
         "Returns a set of roles that you implicitly have if you have this role"
-        descendents = set()
-        for target_team in self.provides_teams.all():
-            # the roles that offer these permissions could change as a result of adding teams
-            descendents.update(set(target_team.has_roles.all()))
-        return descendents
+        # the roles that offer these permissions could change as a result of adding teams
+        # roles of all teams this role gives membership to are fetched in one query
+        return set(ObjectRole.objects.filter(teams__member_roles=self))
 
     def expected_direct_permissions(self, types_prefetch=None):
         expected_evaluations = set()
-        cached_id_lists = {}
         if not types_prefetch:
             types_prefetch = TypesPrefetch()
         role_content_type = types_prefetch.get_content_type(self.content_type_id)
         role_model = role_content_type.model_class()
         # ObjectRole.object_id is stored as text, we convert it to the model pk native type
         object_id = role_model._meta.pk.to_python(self.object_id)
+
+        # Inspect the child models of the role model once, instead of once for every permission
+        # child_paths gives the filter path to the role object, add_paths gives the path for add permissions
+        child_paths = {}
+        add_paths = {}
+        for path, model in permission_registry.get_child_models(role_model):
+            model_name = model._meta.model_name
+            child_paths.setdefault(model_name, (path, model))
+            if '__' in path:
+                add_paths[model_name] = path.split('__', 1)
+
+        # child object evaluations are grouped by evaluation content type, with values (model, filter_path, codenames)
+        child_evaluations = {}
         for permission in types_prefetch.permissions_for_object_role(self):
             permission_content_type = types_prefetch.get_content_type(permission.content_type_id)
 
@@ -535,62 +588,78 @@ class ObjectRole(ObjectRoleFields):
 
             # add child object permission on child objects
             # Only propogate add permission to children which are parents of the permission model
-            filter_path = None
-            child_model = None
             if is_add_perm(permission.codename):
-                for path, model in permission_registry.get_child_models(role_model):
-                    if '__' in path and model._meta.model_name == permission_content_type.model:
-                        path_to_parent, filter_path = path.split('__', 1)
-                        child_model = permission_content_type.model_class()._meta.get_field(path_to_parent).related_model
-                        eval_ct = ContentType.objects.get_for_model(child_model).id
-                if not child_model:
+                if permission_content_type.model not in add_paths:
                     continue
+                path_to_parent, filter_path = add_paths[permission_content_type.model]
+                child_model = permission_content_type.model_class()._meta.get_field(path_to_parent).related_model
+                eval_ct = permission_registry.get_content_type_id(child_model)
             else:
-                for path, model in permission_registry.get_child_models(role_model):
-                    if model._meta.model_name == permission_content_type.model:
-                        filter_path = path
-                        child_model = model
-                        eval_ct = permission.content_type_id
-                        break
-                else:
+                if permission_content_type.model not in child_paths:
                     logger.warning(f'{self.role_definition} listed {permission.codename} but model is not a child, ignoring')
                     continue
-
-            # fetching child objects of an organization is very performance sensitive
-            # for multiple permissions of same type, make sure to only do query once
-            id_list = []
-            if eval_ct in cached_id_lists:
-                id_list = cached_id_lists[eval_ct]
-            else:
-                id_list = child_model.objects.filter(**{filter_path: object_id}).values_list('pk', flat=True)
-                cached_id_lists[eval_ct] = list(id_list)
-
-            for id in id_list:
-                expected_evaluations.add((permission.codename, eval_ct, id))
+                filter_path, child_model = child_paths[permission_content_type.model]
+                eval_ct = permission.content_type_id
+
+            if eval_ct not in child_evaluations:
+                child_evaluations[eval_ct] = (child_model, filter_path, [])
+            child_evaluations[eval_ct][2].append(permission.codename)
+
+        # fetching child objects of an organization is very performance sensitive
+        # for multiple permissions of same type, make sure to only do query once
+        # ids of all child types with the same primary key type are read in one UNION query
+        # so the ids keep their native type and need no conversion
+        # ids are streamed into the set, so a full list of child ids is never held alongside it
+        child_qs_by_pk_type = {}
+        for eval_ct, (child_model, filter_path, codenames) in child_evaluations.items():
+            child_qs = (
+                child_model.objects.filter(**{filter_path: object_id}).order_by().values_list(models.Value(eval_ct, output_field=models.IntegerField()), 'pk')
+            )
+            child_qs_by_pk_type.setdefault(get_evaluation_model(child_model), []).append(child_qs)
+        for child_qs_list in child_qs_by_pk_type.values():
+            for eval_ct, child_pk in child_qs_list[0].union(*child_qs_list[1:], all=True).iterator(chunk_size=2000):
+                expected_evaluations.update((codename, eval_ct, child_pk) for codename in child_evaluations[eval_ct][2])
         return expected_evaluations
 
     def needed_cache_updates(self, types_prefetch=None):
-        existing_partials = dict()
-        for permission_partial in self.permission_partials.all():
-            existing_partials[permission_partial.obj_perm_id()] = permission_partial
-        for permission_partial in self.permission_partials_uuid.all():
-            existing_partials[permission_partial.obj_perm_id()] = permission_partial
+        """Compares existing evaluations for this role to what they should be
 
+        Returns a tuple of (to_delete, to_add)
+        to_delete is a set of (evaluation id, object id type) tuples for existing entries
+        to_add is a list of unsaved evaluations, these are immutable so they must be saved with bulk_create
+        """
+        # maps the obj_perm_id tuple of existing evaluations to their id, only needed columns are fetched
+        existing_partials = dict()
+        # each row gives a new codename string, keep one copy per codename so large roles do not hold duplicates
+        codenames = dict()
+        for partials in (self.permission_partials, self.permission_partials_uuid):
+            for evaluation_id, codename, ct_id, object_id in partials.values_list('id', 'codename', 'content_type_id', 'object_id'):
+                codename = codenames.setdefault(codename, codename)
+                existing_partials[(codename, ct_id, object_id)] = evaluation_id
+
+        if types_prefetch is None:
+            # share one prefetch between this role and the roles of its teams
+            types_prefetch = TypesPrefetch()
         expected_evaluations = self.expected_direct_permissions(types_prefetch)
 
-        for team in self.provides_teams.all():
-            for team_role in team.has_roles.all():
-                expected_evaluations.update(team_role.expected_direct_permissions(types_prefetch))
-
-        existing_set = set(existing_partials.keys())
+        # roles held by the teams this role gives membership to, each only listed once even if it applies to several teams
+        for team_role in ObjectRole.objects.filter(teams__member_roles=self).distinct().select_related('role_definition'):
+            expected_evaluations.update(team_role.expected_direct_permissions(types_prefetch))
 
+        # membership checks against the existing and expected data, so no intermediate difference sets are built
         to_delete = set()
-        for identifier in existing_set - expected_evaluations:
-            to_delete.add((existing_partials[identifier].id, type(identifier[-1])))
+        for identifier, evaluation_id in existing_partials.items():
+            if identifier not in expected_evaluations:
+                to_delete.add((evaluation_id, type(identifier[-1])))
 
+        # evaluations for UUID objects are constructed as their own model, so they can be bulk created as they are
         to_add = []
-        for codename, ct_id, obj_pk in expected_evaluations - existing_set:
-            to_add.append(RoleEvaluation(codename=codename, content_type_id=ct_id, object_id=obj_pk, role=self))
+        for identifier in expected_evaluations:
+            if identifier in existing_partials:
+                continue
+            codename, ct_id, obj_pk = identifier
+            eval_cls = RoleEvaluationUUID if isinstance(obj_pk, UUID) else RoleEvaluation
+            to_add.append(eval_cls(codename=codename, content_type_id=ct_id, object_id=obj_pk, role_id=self.id))
 
         return (to_delete, to_add)
 
@@ -599,12 +668,24 @@ class RoleEvaluationMeta:
     app_label = 'dab_rbac'
     verbose_name_plural = _('role_object_permissions')
     indexes = [
-        models.Index(fields=["role", "content_type_id", "object_id"]),  # used by get_roles_on_resource
-        models.Index(fields=["role", "content_type_id", "codename"]),  # used by accessible_objects
+        # used by get_roles_on_resource, codename is included so has_obj_perm and get_permissions can use an index-only scan
+        models.Index(fields=["role", "content_type_id", "object_id", "codename"]),
+        # used by accessible_objects and accessible_ids, object_id is included so these can use an index-only scan
+        models.Index(fields=["role", "content_type_id", "codename", "object_id"]),
     ]
     constraints = [models.UniqueConstraint(name='one_entry_per_object_permission_and_role', fields=['object_id', 'content_type_id', 'codename', 'role'])]
 
 
+def actor_role_ids(actor) -> QuerySet:
+    """Subquery of the ids of object roles held by a user or team
+
+    This reads the assignment (through) table directly, which avoids joining the ObjectRole table
+    like actor.has_roles.all() would, and is used for every permission evaluation
+    """
+    roles_field = actor._meta.model.has_roles.rel.field  # ObjectRole.users or ObjectRole.teams, works for lazy request.user
+    return roles_field.remote_field.through.objects.filter(**{roles_field.m2m_reverse_field_name(): actor.pk}).values(roles_field.m2m_field_name())
+
+
 # COMPUTED DATA
 class RoleEvaluationFields(models.Model):
     """
@@ -660,11 +741,11 @@ class RoleEvaluationFields(models.Model):
         """
         # We only have a content_types exception for multiple content types for polymorphic models
         # for normal models you should not need it, but AWX unified_ models need it to get by
-        filter_kwargs = dict(role__in=actor.has_roles.all(), codename=codename)
+        filter_kwargs = dict(role_id__in=actor_role_ids(actor), codename=codename)
         if content_types:
             filter_kwargs['content_type_id__in'] = content_types
         else:
-            filter_kwargs['content_type_id'] = ContentType.objects.get_for_model(model_cls).id
+            filter_kwargs['content_type_id'] = permission_registry.get_content_type_id(model_cls)
         qs = cls.objects.filter(**filter_kwargs)
         if cast_field is None:
             return qs.values_list('object_id').distinct()
@@ -675,7 +756,28 @@ class RoleEvaluationFields(models.Model):
     def accessible_objects(cls, model_cls, user, codename, queryset: Optional[QuerySet] = None) -> QuerySet:
         if queryset is None:
             queryset = model_cls.objects.all()
-        return queryset.filter(pk__in=cls.accessible_ids(model_cls, user, codename))
+        # Correlated EXISTS lets the database do a semi-join, avoiding DISTINCT over the object ids
+        evaluations = cls.objects.filter(
+            role_id__in=actor_role_ids(user),
+            codename=codename,
+            content_type_id=permission_registry.get_content_type_id(model_cls),
+            object_id=models.OuterRef('pk'),
+        )
+        return queryset.filter(models.Exists(evaluations))
+
+    @classmethod
+    def filter_accessible_ids(cls, model_cls, user, codename: str, obj_ids: Iterable) -> set:
+        """
+        Returns the subset of obj_ids that user has the codename permission to
+
+        This is for checking a known list of objects, like a page of results, in a single query
+        as opposed to calling has_obj_perm for each object
+        """
+        return set(
+            cls.objects.filter(
+                role_id__in=actor_role_ids(user), content_type_id=permission_registry.get_content_type_id(model_cls), codename=codename, object_id__in=obj_ids
+            ).values_list('object_id', flat=True)
+        )
 
     @classmethod
     def get_permissions(cls, user, obj):
@@ -683,7 +785,7 @@ class RoleEvaluationFields(models.Model):
         Returns permissions that a user has to obj from object-roles,
         does not consider permissions from user flags or system-wide roles
         """
-        return cls.objects.filter(role__in=user.has_roles.all(), content_type_id=ContentType.objects.get_for_model(obj).id, object_id=obj.id).values_list(
+        return cls.objects.filter(role_id__in=actor_role_ids(user), content_type_id=permission_registry.get_content_type_id(obj), object_id=obj.id).values_list(
             'codename', flat=True
         )
 
@@ -694,7 +796,7 @@ class RoleEvaluationFields(models.Model):
         method on permission classes, but it is named differently to avoid unintentionally conflicting
         """
         return cls.objects.filter(
-            role__in=user.has_roles.all(), content_type_id=ContentType.objects.get_for_model(obj).id, object_id=obj.pk, codename=codename
+            role_id__in=actor_role_ids(user), content_type_id=permission_registry.get_content_type_id(obj), object_id=obj.pk, codename=codename
         ).exists()
 
 
@@ -727,6 +829,13 @@ class RoleEvaluationUUID(RoleEvaluationFields):
 
 
 def get_evaluation_model(cls):
+    "Gives the RoleEvaluation model for a model class or instance, based on its primary key type"
+    return _get_evaluation_model(cls if isinstance(cls, type) else type(cls))
+
+
+@lru_cache(maxsize=None)
+def _get_evaluation_model(cls):
+    "Model classes and the database type of their primary key do not change, so the answer is cached per class"
     pk_field = cls._meta.pk
     # For proxy models, including django-polymorphic, use the id field from parent table
     # we accomplish this by inspecting the raw database type of the field
@@ -31,6 +31,9 @@ class PermissionRegistry:
         self.apps_ready = False
         self._tracked_relationships = set()
         self._trackers = dict()
+        self._content_type_ids = dict()  # model class to ContentType id, filled in lazily
+        self._resource_prefixes = dict()  # model class to API name prefix, filled in lazily
+        self._child_models = dict()  # model name to child models and their filter paths, filled in lazily
 
     def register(self, *args, parent_field_name='organization'):
         if self.apps_ready:
@@ -60,14 +63,27 @@ class PermissionRegistry:
     def get_parent_fd_name(self, model) -> Optional[str]:
         return self._parent_fields.get(model._meta.model_name)
 
-    def get_child_models(self, parent_model, seen=None) -> list[tuple[str, Type[Model]]]:
+    def get_child_models(self, parent_model) -> list[tuple[str, Type[Model]]]:
         """Returns child models and the filter relationship to the parent
 
         This is used for rebuilding RoleEvaluation entries.
         For the given parent model like organization, this returns a list of tuples that contains
          - path like "parent__organization" in Model.objects.filter(parent__organization=organization)
          - the model class which is a child resource of the parent model
+
+        Registrations are final once apps are ready, so after that the result is saved for each model.
+        Callers share the returned list and must not modify it.
         """
+        model_name = parent_model._meta.model_name
+        try:
+            return self._child_models[model_name]
+        except KeyError:
+            child_models = self._get_child_models(parent_model)
+            if self.apps_ready:
+                self._child_models[model_name] = child_models
+            return child_models
+
+    def _get_child_models(self, parent_model, seen=None) -> list[tuple[str, Type[Model]]]:
         if not seen:
             seen = set()
         child_filters = []
@@ -83,12 +99,23 @@ class PermissionRegistry:
                 seen.add(model_name)
 
                 child_filters.append((parent_field_name, child_model))
-                for next_parent_filter, grandchild_model in self.get_child_models(child_model, seen=seen):
+                for next_parent_filter, grandchild_model in self._get_child_models(child_model, seen=seen):
                     child_filters.append((f'{next_parent_filter}__{parent_field_name}', grandchild_model))
         return child_filters
 
     def get_resource_prefix(self, cls: Type[Model]) -> str:
-        """For a given model class, give the prefix like shared, of API naming like shared.team"""
+        """For a given model class, give the prefix like shared, of API naming like shared.team
+
+        This only depends on code-defined resource configuration, so it is saved for each model.
+        """
+        try:
+            return self._resource_prefixes[cls]
+        except KeyError:
+            prefix = self._get_resource_prefix(cls)
+            self._resource_prefixes[cls] = prefix
+            return prefix
+
+    def _get_resource_prefix(self, cls: Type[Model]) -> str:
         if registry := self.get_resource_registry():
             # duplicates logic in ansible_base/resource_registry/apps.py
             try:
@@ -152,6 +179,7 @@ class PermissionRegistry:
 
         if self.team_model not in self._registry:
             self._registry.add(self.team_model)
+            self._name_to_model.setdefault(self.team_model._meta.model_name, self.team_model)
 
         # Do no specify sender for create_dab_permissions, because that is passed as app_config
         # and we want to create permissions for external apps, not the dab_rbac app
@@ -191,6 +219,24 @@ class PermissionRegistry:
     def team_ct_id(self):
         return self.content_type_model.objects.get_for_model(self.team_model).id
 
+    def get_content_type_id(self, obj: Union[ModelBase, Model]) -> int:
+        """Returns the ContentType id for the given object or class, cached per model class
+
+        This is called on the permission evaluation hot path, so we avoid the manager entirely
+        after the first call. Like the manager, this uses the concrete model for proxy models.
+        """
+        cls = obj if isinstance(obj, ModelBase) else type(obj)
+        try:
+            return self._content_type_ids[cls]
+        except KeyError:
+            ct_id = self.content_type_model.objects.get_for_model(cls).id
+            self._content_type_ids[cls] = ct_id
+            return ct_id
+
+    def clear_content_type_cache(self) -> None:
+        "Content type ids may change if the database is flushed, so this is called after migrations"
+        self._content_type_ids = dict()
+
     @property
     def user_model(self):
         return get_user_model()
@@ -226,7 +272,9 @@ class PermissionRegistry:
 
     def is_registered(self, obj: Union[ModelBase, Model]) -> bool:
         """Tells if the given object or class is a type tracked by DAB RBAC"""
-        return any((obj._meta.model_name == cls._meta.model_name and obj._meta.app_label == cls._meta.app_label) for cls in self._registry)
+        # model names are unique in the registry, so this is a dict lookup instead of a scan of registered models
+        cls = self._name_to_model.get(obj._meta.model_name)
+        return bool(cls is not None and obj._meta.app_label == cls._meta.app_label)
 
     def get_model_by_name(self, model_name: str) -> Optional[Type[Model]]:
         """Returns class with given model_name if registered, returns None otherwise"""
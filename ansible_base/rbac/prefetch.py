@@ -13,15 +13,14 @@ class TypesPrefetch:
     @classmethod
     def from_database(cls, RoleDefinition):
         inst = cls()
-        for rd in RoleDefinition.objects.prefetch_related('permissions__content_type'):
+        # content types are not prefetched, get_content_type uses the ContentType manager cache
+        for rd in RoleDefinition.objects.prefetch_related('permissions'):
             inst._role_definitions[rd.id] = rd
             perm_list = []
             for perm in rd.permissions.all():
                 if perm.id not in inst._permissions:
                     inst._permissions[perm.id] = perm
                 perm_list.append(perm.id)
-                if perm.content_type_id not in inst._content_types:
-                    inst._content_types[perm.content_type_id] = perm.content_type
             inst._rd_permissions[rd.id] = perm_list
         return inst
 
@@ -54,7 +54,9 @@ def needed_updates_on_assignment(role_definition, actor, object_role, created=Fa
         has_org_member = role_definition.permissions.filter(codename='member_organization').exists()
 
         # Raise exception if settings prohibits this assignment
-        validate_team_assignment_enabled(object_role.content_type, has_team_perm=has_team_perm, has_org_member=has_org_member)
+        # content type from the manager cache, instead of loading the object_role.content_type relation
+        obj_ct = permission_registry.content_type_model.objects.get_for_id(object_role.content_type_id)
+        validate_team_assignment_enabled(obj_ct, has_team_perm=has_team_perm, has_org_member=has_org_member)
 
     # If permissions for team are changed. That tends to affect a lot.
     changes_team_owners = False
@@ -66,7 +68,7 @@ def needed_updates_on_assignment(role_definition, actor, object_role, created=Fa
         changes_team_owners = True
 
     deleted = False
-    if (not giving) and (not (object_role.users.exists() or object_role.teams.exists())):
+    if (not giving) and (not object_role.has_actors()):
         # time to delete the object role because it is unused
         if object_role in to_update:
             to_update.remove(object_role)
@@ -138,23 +140,45 @@ def rbac_post_init_set_original_parent(sender, instance, **kwargs):
 
 
 def get_parent_ids(instance) -> list[tuple[Model, Union[int, UUID]]]:
-    parent_field_name = permission_registry.get_parent_fd_name(instance)
-    if not parent_field_name:
-        return []
-    parent_cls = permission_registry.get_parent_model(instance)
-
-    if permission_registry.get_parent_fd_name(parent_cls):
-        # has another level of model
-        parent_obj = getattr(instance, parent_field_name)
-        if parent_obj:
-            parent_ct = permission_registry.content_type_model.objects.get_for_model(parent_cls)
-            return [(parent_ct, parent_obj.pk)] + get_parent_ids(parent_obj)
-    else:
-        parent_id = getattr(instance, f'{parent_field_name}_id')
-        if parent_id:
-            parent_ct = permission_registry.content_type_model.objects.get_for_model(parent_cls)
-            return [(parent_ct, parent_id)]
-    return []
+    """Returns content type and id of all the parent objects of instance, going up the parent fields
+
+    Parent objects already loaded on the instance are used as they are, and any ancestors above
+    those are looked up in a single query, instead of loading each parent object in turn.
+    """
+    ret = []
+    obj = instance
+    while True:
+        parent_field_name = permission_registry.get_parent_fd_name(obj)
+        if not parent_field_name:
+            return ret
+        parent_field = obj._meta.get_field(parent_field_name)
+        parent_id = getattr(obj, parent_field.attname)
+        if not parent_id:
+            return ret
+        parent_cls = permission_registry.get_parent_model(obj)
+        ret.append((permission_registry.content_type_model.objects.get_for_model(parent_cls), parent_id))
+        if not parent_field.is_cached(obj):
+            break
+        obj = getattr(obj, parent_field_name)
+
+    # Get the path to every further ancestor, like namespace__organization, relative to parent_cls
+    ancestor_paths = []
+    ancestor_models = []
+    model = parent_cls
+    while parent_field_name := permission_registry.get_parent_fd_name(model):
+        ancestor_paths.append(f'{ancestor_paths[-1]}__{parent_field_name}' if ancestor_paths else parent_field_name)
+        model = permission_registry.get_parent_model(model)
+        ancestor_models.append(model)
+    if not ancestor_paths:
+        return ret
+
+    ancestor_ids = parent_cls.objects.filter(pk=parent_id).values_list(*ancestor_paths).first() or ()
+    ancestor_cts = permission_registry.content_type_model.objects.get_for_models(*ancestor_models)
+    for model, ancestor_id in zip(ancestor_models, ancestor_ids):
+        if not ancestor_id:
+            break
+        ret.append((ancestor_cts[model], ancestor_id))
+    return ret
 
 
 def post_save_update_obj_permissions(instance):
@@ -281,6 +305,9 @@ def post_migration_rbac_setup(sender, *args, **kwargs):
         logger.info('Not running DAB RBAC post_migrate logic because of suspected reverse migration')
         return
 
+    # content types may have been re-created, as happens for a database flush
+    permission_registry.clear_content_type_cache()
+
     dab_post_migrate.send(sender=sender)
 
     compute_team_member_roles()
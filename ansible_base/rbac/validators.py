@@ -1,5 +1,6 @@
 import re
 from collections import defaultdict
+from functools import lru_cache
 from typing import Optional, Type, Union
 
 from django.conf import settings
@@ -42,10 +43,15 @@ def permissions_allowed_for_system_role() -> dict[Type[Model], list[str]]:
     return permissions_by_model
 
 
+@lru_cache(maxsize=None)
 def permissions_allowed_for_role(cls) -> dict[Type[Model], list[str]]:
-    "Permission codenames valid for a RoleDefinition of given class, organized by permission class"
+    """Permission codenames valid for a RoleDefinition of given class, organized by permission class
+
+    This only depends on the registry, which is fixed once apps are ready, so the result is
+    cached for each class. Callers share the returned data and must not modify it.
+    """
     if cls is None:
-        return permissions_allowed_for_system_role()
+        return dict(permissions_allowed_for_system_role())
 
     if not permission_registry.is_registered(cls):
         raise ValidationError(f'Django-ansible-base RBAC does not track permissions for model {cls._meta.model_name}')
@@ -58,7 +64,7 @@ def permissions_allowed_for_role(cls) -> dict[Type[Model], list[str]]:
     for rel, child_cls in permission_registry.get_child_models(cls):
         permissions_by_model[child_cls] += codenames_for_cls(child_cls)
 
-    return permissions_by_model
+    return dict(permissions_by_model)
 
 
 def combine_values(data: dict[Type[Model], list[str]]) -> set[str]:
@@ -175,6 +181,16 @@ def validate_codename_for_model(codename: str, model: Union[Model, Type[Model]])
     assuming obj is an inventory.
     It also tries to protect the user by throwing an error if the permission does not work.
     """
+    cls = model if isinstance(model, type) else type(model)
+    return _validate_codename_for_model(codename, cls)
+
+
+@lru_cache(maxsize=4096)
+def _validate_codename_for_model(codename: str, model: Type[Model]) -> str:
+    """Result only depends on model metadata and the registry, and this is called for every permission evaluation
+
+    Codenames come from callers, and app-prefixed forms like test_app.say_cow are distinct keys, so the cache is bounded
+    """
     valid_codenames = codenames_for_cls(model)
     if (not codename.startswith('add')) and codename in valid_codenames:
         return codename
@@ -238,10 +254,9 @@ def validate_assignment(rd, actor, obj) -> None:
     if actor._meta.model_name not in ('user', 'team'):
         raise ValidationError(f'Cannot give permission to {actor}, must be a user or team')
 
-    obj_ct = permission_registry.content_type_model.objects.get_for_model(obj)
-    if obj_ct.id != rd.content_type_id:
+    if permission_registry.get_content_type_id(obj) != rd.content_type_id:
         rd_model = getattr(rd.content_type, "model", "global")
-        raise ValidationError(f'Role type {rd_model} does not match object {obj_ct.model}')
+        raise ValidationError(f'Role type {rd_model} does not match object {obj._meta.concrete_model._meta.model_name}')
 
 
 def check_locally_managed(rd: Model) -> None:
@@ -7,10 +7,11 @@ from django.contrib.auth.models import AnonymousUser
 from django.db import connection
 from django.test import override_settings
 from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
 
 from ansible_base.lib.utils.response import get_relative_url
 from ansible_base.rbac.models import RoleDefinition
-from test_app.models import City, EncryptionModel, Organization, RelatedFieldsTestModel, User
+from test_app.models import City, EncryptionModel, Organization, RelatedFieldsTestModel, Team, User
 
 
 @pytest.mark.django_db
@@ -301,3 +302,12 @@ def test_compare_data_types_after_decryption(input):
     decryptor = Fernet256()
     results = decryptor.decrypt_string(decryptor.encrypt_string(input))
     assert type(results) is type(input)
+
+
+@pytest.mark.django_db
+def test_ignored_relations_not_fetched_for_summary_fields(team):
+    team = Team.objects.get(pk=team.pk)
+    with patch('test_app.models.Team.ignore_relations', new=['organization']):
+        with CaptureQueriesContext(connection) as captured:
+            assert 'organization' not in team.get_summary_fields()
+    assert not any(Organization._meta.db_table in query['sql'] for query in captured.captured_queries)
@@ -385,3 +385,9 @@ def test_get_system_user_create_raises_exception(resource_registry_in_installed_
             except ResourceType.DoesNotExist:
                 if resource_registry_in_installed_apps:
                     assert False, "We should not handled the exception since resource_registry is in the installed apps"
+
+
+def test_get_all_field_names_cached_per_model(animal):
+    field_names = models.get_all_field_names(animal)
+    assert isinstance(field_names, frozenset)
+    assert models.get_all_field_names(type(animal)) is field_names
@@ -1,7 +1,11 @@
 import pytest
+from rest_framework.exceptions import ValidationError
 
 from ansible_base.lib.utils.response import get_relative_url
-from ansible_base.rbac.api.serializers import RoleDefinitionSerializer
+from ansible_base.rbac import permission_registry
+from ansible_base.rbac.api.serializers import ContentTypeField, ManyRelatedListField, PermissionField, RoleDefinitionSerializer
+from ansible_base.rbac.models import DABPermission, RoleDefinition
+from test_app.models import Organization
 
 
 @pytest.mark.django_db
@@ -37,3 +41,74 @@ def test_parity_with_resource_registry(admin_api_client):
     for type_name in ('shared.organization', 'shared.team'):
         assert type_name in res_types
         assert type_name in role_types
+
+
+@pytest.mark.django_db
+def test_field_representation():
+    org_ct = permission_registry.content_type_model.objects.get_for_model(Organization)
+    assert ContentTypeField().to_representation(org_ct) == 'shared.organization'
+
+    perm = DABPermission.objects.get(codename='view_organization')
+    assert PermissionField().to_representation(perm) == 'shared.view_organization'
+
+
+@pytest.mark.django_db
+def test_choices_shared_between_instances():
+    field1, field2 = PermissionField(), PermissionField()
+    assert 'shared.view_organization' in field1.choices
+    assert field2.choices is field1.choices
+    assert field2.grouped_choices is field1.grouped_choices
+    assert field2.choice_strings_to_values is field1.choice_strings_to_values
+    # Each field class keeps its own choices
+    assert 'shared.organization' in ContentTypeField().choices
+
+
+@pytest.mark.django_db
+def test_many_related_uses_prefetch(inv_rd, django_assert_num_queries):
+    rd = RoleDefinition.objects.prefetch_related('permissions').get(pk=inv_rd.pk)
+    field = ManyRelatedListField(child=PermissionField())
+    with django_assert_num_queries(0):
+        assert set(field.to_representation(rd.permissions)) == {'aap.view_inventory', 'aap.change_inventory'}
+
+
+@pytest.mark.django_db
+def test_permission_lookup_joins_content_type(django_assert_num_queries):
+    field = PermissionField()
+    field.to_internal_value('shared.view_organization')  # content type cache may be cold
+    with django_assert_num_queries(1):
+        perm = field.to_internal_value('aap.change_inventory')
+        assert perm.content_type.model == 'inventory'  # used by role validation
+    assert perm == DABPermission.objects.get(codename='change_inventory')
+
+
+@pytest.mark.django_db
+def test_permission_list_single_query(django_assert_num_queries):
+    field = ManyRelatedListField(child=PermissionField())
+    field.child.to_internal_value('shared.view_organization')  # content type cache may be cold
+    data = ['shared.view_organization', 'shared.change_organization', 'aap.view_inventory', 'aap.change_inventory']
+    with django_assert_num_queries(1):
+        perms = field.to_internal_value(data)
+        assert [perm.content_type.model for perm in perms] == ['organization', 'organization', 'inventory', 'inventory']
+    assert [perm.codename for perm in perms] == ['view_organization', 'change_organization', 'view_inventory', 'change_inventory']
+
+
+@pytest.mark.django_db
+def test_permission_list_missing_codename():
+    field = ManyRelatedListField(child=PermissionField())
+    with pytest.raises(ValidationError) as exc:
+        field.to_internal_value(['shared.view_organization', 'aap.view_foohomeosi'])
+    assert list(exc.value.detail.keys()) == [1]
+    assert 'object does not exist' in str(exc.value.detail[1])
+
+
+@pytest.mark.django_db
+def test_permission_list_shared_codename():
+    org_ct = permission_registry.content_type_model.objects.get_for_model(Organization)
+    DABPermission.objects.create(codename='view_inventory', content_type=org_ct, name='duplicate codename')
+    lookup = PermissionField().get_dynamic_objects(['aap.view_inventory', 'shared.view_organization'])
+    assert lookup['view_inventory'] is None
+    assert lookup['view_organization'].codename == 'view_organization'
+    # a codename that matches more than one permission is looked up on its own, which does not pick one silently
+    field = ManyRelatedListField(child=PermissionField())
+    with pytest.raises(DABPermission.MultipleObjectsReturned):
+        field.to_internal_value(['shared.view_organization', 'aap.view_inventory'])
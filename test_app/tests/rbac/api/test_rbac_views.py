@@ -1,8 +1,10 @@
 import pytest
-from django.test.utils import override_settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
 
 from ansible_base.lib.utils.response import get_relative_url
 from ansible_base.rbac.models import RoleDefinition
+from test_app.models import Inventory
 
 
 @pytest.mark.django_db
@@ -183,6 +185,15 @@ def test_role_metadata_view(user_api_client):
     assert 'aap.change_collectionimport' in allowed_permissions['aap.namespace']
 
 
+@pytest.mark.django_db
+def test_role_metadata_single_permission_query(user_api_client):
+    with CaptureQueriesContext(connection) as captured:
+        response = user_api_client.get(get_relative_url('role-metadata'))
+    assert response.status_code == 200
+    perm_queries = [query['sql'] for query in captured.captured_queries if 'dab_rbac_dabpermission' in query['sql']]
+    assert len(perm_queries) == 1, perm_queries
+
+
 @override_settings(ANSIBLE_BASE_ALLOW_CUSTOM_ROLES=False)
 def test_role_definitions_post_disabled_by_settings(admin_api_client):
     url = get_relative_url('roledefinition-list')
@@ -190,3 +201,33 @@ def test_role_definitions_post_disabled_by_settings(admin_api_client):
     assert response.status_code == 200, response.data
     print(response.data)
     assert 'POST' not in response.data.get('actions', {})
+
+
+@pytest.mark.django_db
+def test_role_definition_list_query_count(admin_api_client, inv_rd):
+    url = get_relative_url('roledefinition-list')
+    with CaptureQueriesContext(connection) as one_rd:
+        response = admin_api_client.get(url)
+    assert response.status_code == 200
+    for i in range(3):
+        RoleDefinition.objects.create_from_permissions(name=f'inv-viewer-{i}', permissions=['view_inventory'], content_type=inv_rd.content_type)
+    with CaptureQueriesContext(connection) as many_rds:
+        response = admin_api_client.get(url)
+    assert response.data['count'] == 4
+    assert len(many_rds.captured_queries) == len(one_rd.captured_queries)
+
+
+@pytest.mark.django_db
+def test_user_assignment_list_query_count(admin_api_client, inventory, inv_rd, django_user_model):
+    url = get_relative_url('roleuserassignment-list')
+    inv_rd.give_permission(django_user_model.objects.create(username='user-0'), inventory)
+    with CaptureQueriesContext(connection) as one_assignment:
+        response = admin_api_client.get(url)
+    assert response.status_code == 200
+    for i in range(1, 4):
+        inv = Inventory.objects.create(name=f'inv-{i}', organization=inventory.organization)
+        inv_rd.give_permission(django_user_model.objects.create(username=f'user-{i}'), inv)
+    with CaptureQueriesContext(connection) as many_assignments:
+        response = admin_api_client.get(url)
+    assert response.data['count'] == 4
+    assert len(many_assignments.captured_queries) == len(one_assignment.captured_queries)
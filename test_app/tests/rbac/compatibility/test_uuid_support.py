@@ -2,7 +2,8 @@ import pytest
 
 from ansible_base.rbac.models import ObjectRole, RoleDefinition, RoleEvaluation, RoleEvaluationUUID, RoleUserAssignment, get_evaluation_model
 from ansible_base.rbac.permission_registry import permission_registry
-from test_app.models import Organization, UUIDModel
+from ansible_base.rbac.prefetch import TypesPrefetch
+from test_app.models import Namespace, Organization, UUIDModel
 
 
 @pytest.fixture
@@ -87,3 +88,29 @@ def test_visible_items_with_uuid(rando, organization, view_uuid_rd):
 
     assert set(ObjectRole.visible_items(rando)) == set([assignment1.object_role, assignment3.object_role])
     assert set(RoleUserAssignment.visible_items(rando)) == set([assignment1, assignment3])
+
+
+@pytest.mark.django_db
+def test_needed_cache_updates_uuid_model(rando, view_uuid_rd, uuid_obj):
+    assignment = view_uuid_rd.give_permission(rando, uuid_obj)
+    RoleEvaluationUUID.objects.all().delete()
+    to_delete, to_add = assignment.object_role.needed_cache_updates()
+    assert to_delete == set()
+    assert [type(evaluation) for evaluation in to_add] == [RoleEvaluationUUID]
+
+
+@pytest.mark.django_db
+def test_expected_child_ids_mixed_pk_types(rando, organization, inventory, uuid_obj, django_assert_num_queries):
+    namespace = Namespace.objects.create(name='child-namespace', organization=organization)
+    rd, _ = RoleDefinition.objects.get_or_create(
+        permissions=['view_organization', 'view_inventory', 'view_namespace', 'view_uuidmodel'],
+        name='org-view-children',
+        content_type=permission_registry.content_type_model.objects.get_for_model(organization),
+    )
+    object_role = rd.give_permission(rando, organization).object_role
+    types_prefetch = TypesPrefetch.from_database(RoleDefinition)
+    with django_assert_num_queries(2):  # one query for the integer child ids, one for the UUID child ids
+        expected = object_role.expected_direct_permissions(types_prefetch)
+    assert ('view_inventory', permission_registry.get_content_type_id(inventory), inventory.pk) in expected
+    assert ('view_namespace', permission_registry.get_content_type_id(namespace), namespace.pk) in expected
+    assert ('view_uuidmodel', permission_registry.get_content_type_id(uuid_obj), uuid_obj.pk) in expected
@@ -1,3 +1,5 @@
+from unittest import mock
+
 import pytest
 from django.contrib.contenttypes.models import ContentType
 from django.test.utils import override_settings
@@ -61,3 +63,13 @@ def test_custom_creation_perms(rando, inventory):
     with override_settings(ANSIBLE_BASE_CREATOR_DEFAULTS=['change', 'view']):
         RoleDefinition.objects.give_creator_permissions(rando, inventory)
         assert set(perm_name.split('_', 1)[0] for perm_name in RoleEvaluation.get_permissions(rando, inventory)) == {'change', 'view'}
+
+
+@pytest.mark.django_db
+def test_creator_system_perms_skip_object_query(rando, inventory):
+    rd = RoleDefinition.objects.create_from_permissions(name='global-inventory-admin', permissions=INVENTORY_OBJ_PERMS)
+    rd.give_global_permission(rando)
+    rando.singleton_permissions()
+    with mock.patch.object(RoleEvaluation, 'get_permissions', wraps=RoleEvaluation.get_permissions) as get_permissions:
+        RoleDefinition.objects.give_creator_permissions(rando, inventory)
+    get_permissions.assert_not_called()
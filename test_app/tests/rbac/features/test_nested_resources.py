@@ -2,6 +2,7 @@ import pytest
 
 from ansible_base.rbac.models import RoleDefinition
 from ansible_base.rbac.permission_registry import permission_registry
+from ansible_base.rbac.triggers import get_parent_ids
 from test_app.models import CollectionImport, Namespace, Organization
 
 
@@ -46,6 +47,20 @@ def test_grandparent_assignment(rando, organization, namespace, collection, org_
     assert set(Organization.access_qs(rando, 'add_collectionimport')) == set([organization])
 
 
+@pytest.mark.django_db
+def test_get_parent_ids(organization, namespace, collection, django_assert_num_queries):
+    ns_ct = permission_registry.content_type_model.objects.get_for_model(Namespace)
+    org_ct = permission_registry.content_type_model.objects.get_for_model(Organization)
+    expected = [(ns_ct, namespace.id), (org_ct, organization.id)]
+    # namespace and organization are cached from creation
+    with django_assert_num_queries(0):
+        assert get_parent_ids(collection) == expected
+    # ancestors above the instance are fetched together
+    collection = CollectionImport.objects.get(pk=collection.pk)
+    with django_assert_num_queries(1):
+        assert get_parent_ids(collection) == expected
+
+
 @pytest.mark.django_db
 def test_create_grandchild_object(rando, organization, namespace, org_collection_rd):
     org_collection_rd.give_permission(rando, organization)
@@ -111,3 +126,7 @@ def test_later_create_child_obj(namespace):
     collection = CollectionImport(name='bar', namespace=namespace)
     delattr(collection, '__rbac_original_parent_id')
     collection.save()
+
+
+def test_child_models_cached():
+    assert permission_registry.get_child_models(Organization) is permission_registry.get_child_models(Organization)
@@ -2,8 +2,10 @@ from unittest import mock
 
 import pytest
 
-from ansible_base.rbac.models import ObjectRole
-from test_app.models import User
+from ansible_base.rbac import permission_registry
+from ansible_base.rbac.models import ObjectRole, RoleDefinition, RoleUserAssignment
+from ansible_base.rbac.prefetch import TypesPrefetch
+from test_app.models import Inventory, Team, User
 
 
 @pytest.mark.django_db
@@ -16,3 +18,85 @@ def test_existing_object_role_race(inv_rd, inventory):
         assert ObjectRole.objects.filter(object_id=inventory.pk).first() is None  # sanity
         inv_rd.give_permission(user2, inventory)
     assert user2.has_obj_perm(inventory, 'change')
+
+
+@pytest.mark.django_db
+def test_expected_direct_permissions_child_query_count(organization, inventory, org_inv_rd, rando, django_assert_num_queries):
+    org_inv_rd.give_permission(rando, organization)
+    object_role = ObjectRole.objects.get(role_definition=org_inv_rd)
+    types_prefetch = TypesPrefetch.from_database(RoleDefinition)
+
+    # Several inventory permissions are listed, but the inventory ids are only fetched once
+    with django_assert_num_queries(1):
+        evaluations = object_role.expected_direct_permissions(types_prefetch)
+
+    inv_ct_id = permission_registry.content_type_model.objects.get_for_model(inventory).id
+    assert {(codename, inv_ct_id, inventory.pk) for codename in ('change_inventory', 'delete_inventory', 'view_inventory')} <= evaluations
+
+
+@pytest.mark.django_db
+def test_team_role_shared_by_member_teams(organization, inventory, inv_rd, org_team_member_rd, rando):
+    teams = [Team.objects.create(name=f'team-{i}', organization=organization) for i in range(2)]
+    for team in teams:
+        inv_rd.give_permission(team, inventory)
+    org_team_member_rd.give_permission(rando, organization)
+    assert rando.has_obj_perm(inventory, 'change')
+
+    # The organization member role gives membership to both teams, which share the inventory role
+    member_role = ObjectRole.objects.get(role_definition=org_team_member_rd)
+    to_delete, to_add = member_role.needed_cache_updates()
+    assert (to_delete, to_add) == (set(), [])
+
+
+@pytest.mark.django_db
+def test_descendent_roles_single_query(organization, inv_rd, member_rd, org_team_member_rd, rando, django_assert_num_queries):
+    teams = [Team.objects.create(name=f'team-{i}', organization=organization) for i in range(3)]
+    team_roles = set()
+    for i, team in enumerate(teams):
+        inventory = Inventory.objects.create(name=f'inv-{i}', organization=organization)
+        team_roles.add(inv_rd.give_permission(team, inventory).object_role)
+    member_role = org_team_member_rd.give_permission(rando, organization).object_role
+
+    with django_assert_num_queries(1):  # roles of all teams are fetched together
+        assert member_role.descendent_roles() == team_roles
+
+
+@pytest.mark.django_db
+def test_object_role_has_actors(inventory, inv_rd, team, rando, django_assert_num_queries):
+    inv_rd.give_permission(rando, inventory)
+    object_role = ObjectRole.objects.get(role_definition=inv_rd)
+    with django_assert_num_queries(1):
+        assert object_role.has_actors()
+
+    inv_rd.give_permission(team, inventory)
+    inv_rd.remove_permission(rando, inventory)
+    assert object_role.has_actors()  # team still has the role
+
+    inv_rd.remove_permission(team, inventory)
+    assert not ObjectRole.objects.filter(pk=object_role.pk).exists()
+    assert not object_role.has_actors()
+
+
+@pytest.mark.django_db
+def test_object_role_str(inventory, rando, inv_rd, django_assert_num_queries):
+    assignment = inv_rd.give_permission(rando, inventory)
+    object_role = ObjectRole.objects.get(pk=assignment.object_role_id)
+    str(object_role)  # content type cache may be cold
+    object_role = ObjectRole.objects.get(pk=assignment.object_role_id)
+    with django_assert_num_queries(0):
+        assert str(object_role) == f'ObjectRole(pk={object_role.pk}, inventory={inventory.pk})'
+
+
+@pytest.mark.django_db
+def test_assignment_fields_from_object_role_id(inventory, rando, inv_rd, django_assert_num_queries):
+    object_role = inv_rd.give_permission(rando, inventory).object_role
+    with django_assert_num_queries(0):
+        assignment = RoleUserAssignment(object_role=object_role, user=rando)
+    assert assignment.object_id == object_role.object_id
+    with django_assert_num_queries(1):
+        assignment = RoleUserAssignment(object_role_id=object_role.id, user=rando)
+    assert (assignment.object_id, assignment.content_type_id, assignment.role_definition_id) == (
+        str(inventory.pk),
+        object_role.content_type_id,
+        object_role.role_definition_id,
+    )
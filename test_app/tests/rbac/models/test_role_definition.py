@@ -1,11 +1,13 @@
 import pytest
 from django.contrib.contenttypes.models import ContentType
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from rest_framework.exceptions import ValidationError
 
 from ansible_base.rbac import permission_registry
 from ansible_base.rbac.models import DABPermission, ObjectRole, RoleDefinition, RoleEvaluation
-from ansible_base.rbac.validators import validate_permissions_for_model
-from test_app.models import ExampleEvent, Organization
+from ansible_base.rbac.validators import permissions_allowed_for_role, validate_permissions_for_model
+from test_app.models import ExampleEvent, Inventory, Organization
 
 
 @pytest.mark.django_db
@@ -19,6 +21,21 @@ def test_reuse_by_permission_list():
     assert (not created) and (rd2 == rd1)
 
 
+@pytest.mark.django_db
+def test_no_reuse_for_subset_or_superset():
+    rd1, created = RoleDefinition.objects.get_or_create(permissions=['view_inventory', 'change_inventory'], name='test-changer')
+    assert created
+
+    rd2, created = RoleDefinition.objects.get_or_create(permissions=['view_inventory'], name='test-viewer')
+    assert created and rd2 != rd1
+
+    rd3, created = RoleDefinition.objects.get_or_create(permissions=['view_inventory', 'change_inventory', 'delete_inventory'], name='test-deleter')
+    assert created and rd3 not in (rd1, rd2)
+
+    rd4, created = RoleDefinition.objects.get_or_create(permissions=['change_inventory', 'view_inventory'], name='test-changer-two')
+    assert (not created) and rd4 == rd1
+
+
 @pytest.mark.django_db
 def test_root_resource_add_invalid():
     with pytest.raises(ValidationError) as exc:
@@ -37,6 +54,33 @@ def test_missing_view_permission():
     assert 'needs to include view' in str(exc)
 
 
+@pytest.mark.django_db
+def test_create_from_permissions_query_count():
+    # permissions are fetched in one query, so query count does not scale with the number of permissions
+    RoleDefinition.objects.create_from_permissions(name='inv-changer', permissions=['view_inventory', 'change_inventory'])
+    with CaptureQueriesContext(connection) as one_perm:
+        RoleDefinition.objects.create_from_permissions(name='inv-viewer', permissions=['view_inventory'])
+    with CaptureQueriesContext(connection) as many_perms:
+        rd = RoleDefinition.objects.create_from_permissions(name='inv-admin', permissions=['view_inventory', 'change_inventory', 'delete_inventory'])
+    assert len(many_perms.captured_queries) == len(one_perm.captured_queries)
+    assert set(rd.permissions.values_list('codename', flat=True)) == {'view_inventory', 'change_inventory', 'delete_inventory'}
+
+
+@pytest.mark.django_db
+def test_create_from_nonexistent_permission():
+    with pytest.raises(DABPermission.DoesNotExist) as exc:
+        RoleDefinition.objects.create_from_permissions(name='bad-role', permissions=['view_inventory', 'fly_inventory'])
+    assert 'fly_inventory' in str(exc)
+    assert not RoleDefinition.objects.filter(name='bad-role').exists()
+
+
+def test_permissions_allowed_for_role_cached():
+    allowed = permissions_allowed_for_role(Organization)
+    assert permissions_allowed_for_role(Organization) is allowed
+    assert 'change_inventory' in allowed[Inventory]
+    assert 'add_organization' not in allowed[Organization]
+
+
 @pytest.mark.django_db
 def test_permission_for_unregistered_model():
     with pytest.raises(DABPermission.DoesNotExist):
@@ -4,7 +4,8 @@ from django.test.utils import override_settings
 from ansible_base.lib.utils.models import is_add_perm
 from ansible_base.rbac.models import ObjectRole, RoleDefinition, RoleEvaluation, RoleUserAssignment
 from ansible_base.rbac.permission_registry import permission_registry
-from test_app.models import Inventory, Organization
+from ansible_base.rbac.validators import validate_codename_for_model
+from test_app.models import Inventory, Organization, ProxyInventory, User
 
 
 @pytest.mark.django_db
@@ -53,6 +54,35 @@ def test_access_qs_with_parent_qs(inventory, rando, inv_rd):
     assert list(Inventory.access_qs(rando, queryset=Inventory.objects.none())) == []
 
 
+@pytest.mark.django_db
+def test_access_qs_uses_exists(inventory, rando, inv_rd):
+    inv_rd.give_permission(rando, inventory)
+    Inventory.objects.create(name='other-inv', organization=inventory.organization)
+    qs = Inventory.access_qs(rando, 'change')
+    assert qs.query.distinct is False
+    assert list(qs) == [inventory]
+
+
+@pytest.mark.django_db
+def test_access_ids_qs_reads_assignments(inventory, rando, team, inv_rd, django_assert_num_queries):
+    other_inv = Inventory.objects.create(name='other-inv', organization=inventory.organization)
+    inv_rd.give_permission(rando, inventory)
+    inv_rd.give_permission(team, other_inv)
+    for actor, expected_ids in ((rando, [(inventory.id,)]), (team, [(other_inv.id,)])):
+        qs = Inventory.access_ids_qs(actor)
+        with django_assert_num_queries(1):
+            assert list(qs) == expected_ids
+
+
+@pytest.mark.django_db
+def test_filter_accessible_ids(inventory, rando, inv_rd, django_assert_num_queries):
+    inv_rd.give_permission(rando, inventory)
+    other_inv = Inventory.objects.create(name='other-inv', organization=inventory.organization)
+    with django_assert_num_queries(1):
+        assert RoleEvaluation.filter_accessible_ids(Inventory, rando, 'change_inventory', [inventory.pk, other_inv.pk]) == {inventory.pk}
+    assert RoleEvaluation.filter_accessible_ids(Inventory, rando, 'delete_inventory', [inventory.pk, other_inv.pk]) == set()
+
+
 @pytest.mark.django_db
 def test_resource_add_permission(rando, inventory):
     rd, _ = RoleDefinition.objects.get_or_create(
@@ -112,6 +142,16 @@ def test_visible_items():
     assert set(RoleUserAssignment.visible_items(u3)) == set([inv_1])
 
 
+@pytest.mark.django_db
+def test_visible_items_system_role(rando, inventory, inv_rd, django_assert_num_queries):
+    assignment = inv_rd.give_permission(User.objects.create(username='inv-admin'), inventory)
+    system_rd = RoleDefinition.objects.create_from_permissions(permissions=['view_inventory'], name='system-view-inv', content_type=None)
+    system_rd.give_global_permission(rando)
+    assert set(RoleUserAssignment.visible_items(rando)) == set([assignment, rando.role_assignments.get()])
+    with django_assert_num_queries(0):  # system-wide content types are cached on the user
+        RoleUserAssignment.visible_items(rando)
+
+
 @pytest.mark.django_db
 @override_settings(ANSIBLE_BASE_BYPASS_SUPERUSER_FLAGS=['is_superuser'])
 def test_superuser_can_do_anything(inventory):
@@ -126,6 +166,36 @@ def test_superuser_flag_not_considered(inventory):
     assert not user.has_obj_perm(inventory, 'change')
 
 
+@pytest.mark.django_db
+@override_settings(ANSIBLE_BASE_BYPASS_SUPERUSER_FLAGS=[], ANSIBLE_BASE_BYPASS_ACTION_FLAGS={'view_inventory': 'is_superuser'})
+def test_action_flag_bypass(inventory):
+    user = permission_registry.user_model.objects.create(username='superuser', is_superuser=True)
+    assert user.has_obj_perm(inventory, 'view')
+    assert not user.has_obj_perm(inventory, 'change')
+
+
+@pytest.mark.django_db
+def test_cached_content_type_id(inventory):
+    expected_id = permission_registry.content_type_model.objects.get_for_model(Inventory).id
+    assert permission_registry.get_content_type_id(inventory) == expected_id
+    assert permission_registry.get_content_type_id(Inventory) == expected_id
+    # Like the ContentType manager, proxy models use the concrete model type
+    assert permission_registry.get_content_type_id(ProxyInventory) == expected_id
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('codename', ['change', 'change_inventory', 'aap.change_inventory'])
+def test_validate_codename_for_model(inventory, codename):
+    assert validate_codename_for_model(codename, inventory) == 'change_inventory'
+    assert validate_codename_for_model(codename, Inventory) == 'change_inventory'
+
+
+def test_validate_invalid_codename_for_model():
+    for i in range(2):  # errors are raised every time, not cached
+        with pytest.raises(RuntimeError):
+            validate_codename_for_model('add_inventory', Inventory)
+
+
 @pytest.mark.parametrize(
     'codename,expect',
     [
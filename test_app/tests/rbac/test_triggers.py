@@ -1,9 +1,19 @@
+from unittest import mock
 from unittest.mock import MagicMock
 
 import pytest
 from django.apps import apps
-from django.test.utils import override_settings
-
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from ansible_base.rbac.caching import (
+    all_team_parents,
+    compute_object_role_permissions,
+    compute_team_member_roles,
+    get_org_team_mapping,
+    get_team_member_roles_and_parents,
+    save_evaluation_changes,
+)
 from ansible_base.rbac.models import ObjectRole, RoleEvaluation, RoleTeamAssignment, RoleUserAssignment
 from ansible_base.rbac.permission_registry import permission_registry
 from ansible_base.rbac.triggers import dab_post_migrate, post_migration_rbac_setup
@@ -19,6 +29,52 @@ def test_post_migrate_signals():
     mck.ad_hoc_func.assert_called_once_with(sender=apps.get_app_config('dab_rbac'), signal=dab_post_migrate)
 
 
+@pytest.mark.django_db
+def test_evaluations_saved_in_batches(organization, rando, org_inv_rd):
+    invs = [Inventory.objects.create(name=f'inv-{i}', organization=organization) for i in range(5)]
+    with override_settings(ANSIBLE_BASE_EVALUATIONS_BATCH_SIZE=2):
+        org_inv_rd.give_permission(rando, organization)
+        assert all(rando.has_obj_perm(inv, 'change') for inv in invs)
+
+        org_inv_rd.remove_permission(rando, organization)
+        assert not any(rando.has_obj_perm(inv, 'change') for inv in invs)
+        assert not RoleEvaluation.objects.exists()
+
+
+@pytest.mark.django_db
+def test_global_recompute_saves_as_it_goes(organization, rando, inv_rd):
+    invs = [Inventory.objects.create(name=f'inv-{i}', organization=organization) for i in range(4)]
+    for inv in invs:
+        inv_rd.give_permission(rando, inv)
+    expected = set(RoleEvaluation.objects.values_list('role_id', 'codename', 'object_id'))
+    RoleEvaluation.objects.all().delete()
+
+    with override_settings(ANSIBLE_BASE_EVALUATIONS_BATCH_SIZE=2):
+        with mock.patch('ansible_base.rbac.caching.save_evaluation_changes', wraps=save_evaluation_changes) as save_changes:
+            compute_object_role_permissions()
+    assert save_changes.call_count > 1
+    assert set(RoleEvaluation.objects.values_list('role_id', 'codename', 'object_id')) == expected
+
+
+@pytest.mark.django_db
+def test_recompute_no_roles(django_assert_num_queries):
+    with django_assert_num_queries(0):
+        compute_object_role_permissions(object_roles=set())
+
+
+@pytest.mark.django_db
+def test_global_recompute_role_definitions_prefetched(organization, rando, team, inv_rd, org_inv_rd, member_rd):
+    for i in range(3):
+        inv_rd.give_permission(rando, Inventory.objects.create(name=f'inv-{i}', organization=organization))
+    org_inv_rd.give_permission(team, organization)
+    member_rd.give_permission(rando, team)
+    with CaptureQueriesContext(connection) as captured:
+        compute_object_role_permissions()
+    # role definitions are only loaded once up front, not for each object role
+    rd_queries = [query['sql'] for query in captured.captured_queries if 'FROM "dab_rbac_roledefinition"' in query['sql']]
+    assert len(rd_queries) == 1, rd_queries
+
+
 @pytest.mark.django_db
 def test_change_parent_field(team, rando, inventory, org_inv_rd, member_rd):
     member_rd.give_permission(rando, team)
@@ -172,3 +228,73 @@ def test_delete_signals_team_organization(organization, inventory, team, org_inv
         assert not RoleEvaluation.objects.filter(**org_gfk).exists()
 
     assert not RoleEvaluation.objects.filter(**inv_gfk).exists()
+
+
+@pytest.mark.django_db
+def test_team_member_roles_and_parents(organization, team, rando, member_rd, org_team_member_rd, django_assert_num_queries):
+    parent_team = permission_registry.team_model.objects.create(name='parent-team', organization=organization)
+    team_assignment = member_rd.give_permission(parent_team, team)
+    org_assignment = org_team_member_rd.give_permission(rando, organization)
+
+    org_team_mapping = get_org_team_mapping()
+    assert sorted(org_team_mapping[organization.id]) == sorted([team.id, parent_team.id])
+    # one query for the roles and one for the teams that hold them
+    with django_assert_num_queries(2):
+        direct_member_roles, team_team_parents = get_team_member_roles_and_parents(org_team_mapping)
+    assert set(direct_member_roles[team.id]) == {team_assignment.object_role_id, org_assignment.object_role_id}
+    assert direct_member_roles[parent_team.id] == [org_assignment.object_role_id]
+    assert dict(team_team_parents) == {team.id: [parent_team.id]}
+
+
+@pytest.mark.parametrize(
+    'team_team_parents,expected',
+    [
+        ({}, set()),
+        ({1: [2], 2: [3], 3: [4]}, {2, 3, 4}),
+        ({1: [2, 3], 2: [4], 3: [4]}, {2, 3, 4}),
+        ({1: [2], 2: [1]}, {1, 2}),  # loop in the graph
+        ({i: [i + 1] for i in range(1, 5000)}, set(range(2, 5001))),  # deeper than the recursion limit
+    ],
+)
+def test_all_team_parents(team_team_parents, expected):
+    assert all_team_parents(1, team_team_parents) == expected
+
+
+@pytest.mark.django_db
+def test_compute_team_member_roles_diff(organization, rando, member_rd, org_team_member_rd):
+    teams = [permission_registry.team_model.objects.create(name=f'team-{i}', organization=organization) for i in range(3)]
+    team_assignment = member_rd.give_permission(rando, teams[0])
+    org_assignment = org_team_member_rd.give_permission(rando, organization)
+    links = ObjectRole.provides_teams.through.objects
+    expected = set(links.values_list('team_id', 'objectrole_id'))
+    assert (teams[0].id, team_assignment.object_role_id) in expected
+    assert all((team.id, org_assignment.object_role_id) in expected for team in teams)
+
+    # missing links are added back and stale links are removed
+    links.filter(team=teams[1]).delete()
+    links.create(team=teams[2], objectrole_id=team_assignment.object_role_id)
+    compute_team_member_roles()
+    assert set(links.values_list('team_id', 'objectrole_id')) == expected
+
+
+@pytest.mark.django_db
+def test_compute_team_member_roles_no_member_roles(team, rando, inv_rd, inventory, member_rd, django_assert_num_queries):
+    member_rd.give_permission(rando, team)
+    ObjectRole.objects.filter(role_definition=member_rd).delete()
+    inv_assignment = inv_rd.give_permission(rando, inventory)  # not a team membership role
+    links = ObjectRole.provides_teams.through.objects
+    links.create(team=team, objectrole_id=inv_assignment.object_role_id)  # stale link
+    # one query to check for roles giving membership, and one to remove stale links
+    with django_assert_num_queries(2):
+        compute_team_member_roles()
+    assert not links.exists()
+
+
+@pytest.mark.django_db
+def test_team_assignment_content_type_cached(team, inventory, inv_rd):
+    inv_rd.give_permission(team, inventory)
+    inv_rd.remove_permission(team, inventory)
+    # content types are already in the manager cache, so they are not fetched again
+    with mock.patch.object(permission_registry.content_type_model.objects, 'get', wraps=permission_registry.content_type_model.objects.get) as ct_get:
+        inv_rd.give_permission(team, inventory)
+    ct_get.assert_not_called()